@@ -0,0 +1,132 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Configuración del control de admisión de cargas de sesiones
+MAX_CONCURRENT_LOADS = int(os.getenv("F1_MAX_CONCURRENT_LOADS", "2"))  # Cargas simultáneas
+MAX_QUEUE = int(os.getenv("F1_MAX_QUEUE", "8"))  # Peticiones en espera en total
+MAX_QUEUE_PER_USER = int(os.getenv("F1_MAX_QUEUE_PER_USER", "2"))  # Peticiones en espera por usuario
+
+
+class AdmissionController():
+    """
+    Limita el número de operaciones costosas que se ejecutan a la vez.
+
+    Las peticiones que no obtienen turno esperan en una cola acotada por usuario y los
+    turnos se reparten por rondas entre usuarios, de modo que uno solo no puede acaparar
+    la cola. Si la cola está llena se responde de inmediato con `503` y `Retry-After`.
+    """
+
+    def __init__(self, max_concurrentes: int, max_cola: int, max_cola_usuario: int):
+        """
+        Args:
+            max_concurrentes (int): Operaciones que pueden ejecutarse a la vez.
+            max_cola (int): Peticiones que pueden esperar turno en total.
+            max_cola_usuario (int): Peticiones que puede tener en espera un mismo usuario.
+        """
+        self.max_concurrentes = max_concurrentes
+        self.max_cola = max_cola
+        self.max_cola_usuario = max_cola_usuario
+        self.activos = 0  # Operaciones en ejecución
+        self.esperando = 0  # Peticiones en cola
+        self._colas: "OrderedDict[str, deque]" = OrderedDict()  # Cola de espera de cada usuario
+        self._duracion_media = 10.0  # Estimación (s) de lo que dura una operación
+
+    def _retry_after(self) -> int:
+        """Estima en segundos cuándo habrá hueco en la cola."""
+        return max(1, math.ceil(self._duracion_media * (self.esperando + 1) / self.max_concurrentes))
+
+    def _rechazar(self):
+        raise HTTPException(
+            status_code=503,
+            detail="El servidor está ocupado cargando sesiones. Inténtalo de nuevo más tarde.",
+            headers={"Retry-After": str(self._retry_after())},
+        )
+
+    async def _adquirir(self, usuario: str):
+        if self.activos < self.max_concurrentes and not self.esperando:
+            self.activos += 1
+            return
+
+        cola = self._colas.get(usuario)
+        if self.esperando >= self.max_cola or (cola is not None and len(cola) >= self.max_cola_usuario):
+            self._rechazar()
+
+        if cola is None:
+            cola = self._colas[usuario] = deque()
+        turno = asyncio.get_running_loop().create_future()
+        cola.append(turno)
+        self.esperando += 1
+
+        try:
+            await turno
+        except asyncio.CancelledError:
+            if turno.done() and not turno.cancelled():
+                # El turno se concedió justo antes de cancelar: se cede al siguiente
+                self._liberar()
+            elif turno in cola:
+                cola.remove(turno)
+                self.esperando -= 1
+                if not cola and self._colas.get(usuario) is cola:
+                    del self._colas[usuario]
+            raise
+
+    def _liberar(self):
+        """Cede el turno al siguiente usuario en la ronda o libera el hueco."""
+        while self._colas:
+            usuario, cola = next(iter(self._colas.items()))
+            turno = cola.popleft()
+            self.esperando -= 1
+            if cola:
+                self._colas.move_to_end(usuario)
+            else:
+                del self._colas[usuario]
+            if not turno.done():
+                turno.set_result(None)
+                return
+        self.activos -= 1
+
+    @asynccontextmanager
+    async def turno(self, usuario: str):
+        """
+        Espera turno para `usuario` y lo libera al salir del bloque.
+
+        Raises:
+            HTTPException: `503` con `Retry-After` si la cola está llena.
+        """
+        await self._adquirir(usuario)
+        inicio = time.monotonic()
+        try:
+            yield
+        finally:
+            self._duracion_media = 0.8 * self._duracion_media + 0.2 * (time.monotonic() - inicio)
+            self._liberar()
+
+
+def clave_usuario(request: Request, current_user: Optional[dict]) -> str:
+    """
+    Identifica al solicitante por el `sub` del JWT o, sin token, por su dirección IP.
+
+    Detrás de un balanceador, uvicorn debe arrancarse con `--proxy-headers` y
+    `--forwarded-allow-ips` con la IP del balanceador: así `request.client` es la
+    dirección original de `X-Forwarded-For` y cada cliente anónimo tiene su propia cola
+    en lugar de compartir la del balanceador. La cabecera no se lee aquí directamente
+    porque sin esa lista de IPs de confianza cualquier cliente podría falsificarla.
+    """
+    if current_user and current_user.get("sub"):
+        return current_user["sub"]
+    return request.client.host if request.client else "anonimo"
+
+
+# Limitador compartido para las cargas de sesiones de F1
+limitador_sesiones = AdmissionController(MAX_CONCURRENT_LOADS, MAX_QUEUE, MAX_QUEUE_PER_USER)
@@ -0,0 +1,171 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.models import RaceData
+
+# Operadores admitidos en los filtros `campo:operador:valor`
+OPERADORES = ("gt", "lt", "eq", "in")
+
+# Campos de `RaceData` y su tipo
+CAMPOS = {nombre: campo.annotation for nombre, campo in RaceData.model_fields.items()}
+
+
+class ConsultaCircuitos():
+    """
+    Filtros, orden y límite sobre los campos de `RaceData`.
+
+    La consulta se puede trasladar a Supabase (`aplicar`) o evaluar sobre una copia
+    en columnas de la tabla (`ColumnasCircuitos.seleccionar`).
+    """
+
+    def __init__(self, filtros: List[tuple], sort: Optional[str] = None, descendente: bool = False,
+                 limit: Optional[int] = None):
+        """
+        Args:
+            filtros (list): Tuplas `(campo, operador, valor)` ya validadas.
+            sort (str, optional): Campo por el que ordenar.
+            descendente (bool): Si el orden es descendente.
+            limit (int, optional): Número máximo de circuitos.
+        """
+        self.filtros = filtros
+        self.sort = sort
+        self.descendente = descendente
+        self.limit = limit
+
+    @classmethod
+    def desde_parametros(cls, circuito: Optional[str], filtros: Optional[List[str]],
+                         sort: Optional[str], limit: Optional[int]) -> "ConsultaCircuitos":
+        """
+        Construye la consulta a partir de los parámetros del endpoint.
+
+        Args:
+            circuito (str, optional): Nombre exacto del circuito.
+            filtros (list, optional): Filtros `campo:operador:valor`; con `in` los valores
+                se separan por comas (p. ej. `duro:in:c1,c2`).
+            sort (str, optional): Campo por el que ordenar; con `-` delante, descendente.
+            limit (int, optional): Número máximo de circuitos.
+
+        Raises:
+            ValueError: Si algún campo, operador o valor no es válido.
+        """
+        parseados = [("circuito", "eq", circuito)] if circuito else []
+        for filtro in filtros or []:
+            partes = filtro.split(":", 2)
+            if len(partes) != 3:
+                raise ValueError(f"Filtro '{filtro}' inválido. Formato esperado: campo:operador:valor")
+            campo, operador, valor = partes
+            _validar_campo(campo)
+            if operador not in OPERADORES:
+                raise ValueError(f"Operador '{operador}' inválido. Operadores admitidos: {', '.join(OPERADORES)}")
+            if operador in ("gt", "lt") and CAMPOS[campo] is str:
+                raise ValueError(f"El operador '{operador}' solo se admite en campos numéricos")
+            if operador == "in":
+                parseados.append((campo, operador, [_convertir(campo, v) for v in valor.split(",")]))
+            else:
+                parseados.append((campo, operador, _convertir(campo, valor)))
+
+        descendente = False
+        if sort:
+            descendente = sort.startswith("-")
+            sort = sort.lstrip("-")
+            _validar_campo(sort)
+        if limit is not None and limit < 0:
+            raise ValueError("El límite no puede ser negativo")
+        return cls(parseados, sort, descendente, limit)
+
+    def aplicar(self, query):
+        """Traslada filtros, orden y límite a una consulta de Supabase."""
+        for campo, operador, valor in self.filtros:
+            if operador == "in":
+                query = query.in_(campo, valor)
+            else:
+                query = getattr(query, operador)(campo, valor)
+        if self.sort:
+            query = query.order(self.sort, desc=self.descendente)
+        if self.limit is not None:
+            query = query.limit(self.limit)
+        return query
+
+
+def _validar_campo(campo: str):
+    if campo not in CAMPOS:
+        raise ValueError(f"Campo '{campo}' inválido. Campos admitidos: {', '.join(CAMPOS)}")
+
+
+def _convertir(campo: str, valor: str):
+    """Convierte el valor de un filtro al tipo del campo."""
+    try:
+        return CAMPOS[campo](valor)
+    except ValueError:
+        raise ValueError(f"Valor '{valor}' inválido para el campo '{campo}'")
+
+
+class ColumnasCircuitos():
+    """Copia en memoria de `datos_circuitos` organizada por columnas para filtrar con NumPy."""
+
+    def __init__(self, circuitos: List[Dict]):
+        """
+        Args:
+            circuitos (list): Filas de `datos_circuitos`.
+        """
+        self.circuitos = circuitos
+        self.columnas = {}
+        for campo, tipo in CAMPOS.items():
+            valores = [c.get(campo) for c in circuitos]
+            if tipo is str:
+                self.columnas[campo] = np.array(["" if v is None else v for v in valores], dtype=object)
+            else:
+                self.columnas[campo] = np.array([np.nan if v is None else v for v in valores], dtype=np.float64)
+
+    def seleccionar(self, consulta: ConsultaCircuitos) -> List[Dict]:
+        """Evalúa la consulta con operaciones vectorizadas y devuelve las filas resultantes."""
+        mascara = np.ones(len(self.circuitos), dtype=bool)
+        for campo, operador, valor in consulta.filtros:
+            columna = self.columnas[campo]
+            if operador == "gt":
+                mascara &= columna > valor
+            elif operador == "lt":
+                mascara &= columna < valor
+            elif operador == "eq":
+                mascara &= columna == valor
+            else:
+                mascara &= np.isin(columna, valor)
+
+        posiciones = np.flatnonzero(mascara)
+        if consulta.sort:
+            valores = self.columnas[consulta.sort][posiciones]
+            if consulta.descendente:
+                # Orden descendente que conserva el orden original de los empates
+                orden = np.lexsort((posiciones, _rangos_descendentes(valores)))
+            else:
+                orden = np.argsort(valores, kind="stable")
+            posiciones = posiciones[orden]
+        if consulta.limit is not None:
+            posiciones = posiciones[:consulta.limit]
+        return [self.circuitos[i] for i in posiciones]
+
+
+def _rangos_descendentes(valores: np.ndarray) -> np.ndarray:
+    """Clave numérica que ordena `valores` de mayor a menor, válida también para texto."""
+    _, inversos = np.unique(valores, return_inverse=True)
+    return -inversos
+
+
+_columnas_cache = (None, None)  # (versión de la réplica, ColumnasCircuitos)
+
+
+def columnas_desde_replica(replica_circuitos) -> ColumnasCircuitos:
+    """
+    Devuelve la copia en columnas de la réplica local, reconstruyéndola solo si ha cambiado.
+
+    Args:
+        replica_circuitos (TablaReplica): Réplica local de `datos_circuitos`.
+    """
+    global _columnas_cache
+    version, columnas = _columnas_cache
+    if columnas is None or version != replica_circuitos.version:
+        version = replica_circuitos.version
+        columnas = ColumnasCircuitos(replica_circuitos.leer())
+        _columnas_cache = (version, columnas)
+    return columnas
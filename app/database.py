@@ -0,0 +1,86 @@
+import os
+from typing import Dict, List
+
+from sqlalchemy import create_engine, event, MetaData, Table, bindparam, select
+from sqlalchemy.engine import Connection, Engine
+from dotenv import load_dotenv
+
+# Metadatos compartidos por todas las tablas locales
+metadata = MetaData()
+
+_engine: Engine = None
+
+
+def get_engine() -> Engine:
+    """
+    Devuelve el motor SQLAlchemy de la base de datos local, creándolo en el primer uso.
+
+    La URL se toma de la variable de entorno `LOCAL_DB_URL` (por defecto `sqlite:///test.db`).
+
+    Returns:
+        Engine: Motor de SQLAlchemy compartido por el proceso.
+    """
+    global _engine
+    if _engine is None:
+        load_dotenv()
+        url = os.getenv("LOCAL_DB_URL", "sqlite:///test.db")
+        _engine = create_engine(url)
+
+        if _engine.dialect.name == "sqlite":
+            @event.listens_for(_engine, "connect")
+            def _configurar_sqlite(dbapi_connection, connection_record):
+                # WAL permite lecturas concurrentes mientras se escribe
+                cursor = dbapi_connection.cursor()
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+                cursor.close()
+    return _engine
+
+
+def upsert(conn: Connection, tabla: Table, filas: List[Dict], clave: str):
+    """
+    Inserta o actualiza filas por la columna `clave` en cualquier motor soportado.
+
+    En SQLite y PostgreSQL se usa `INSERT ... ON CONFLICT DO UPDATE`; en el resto de
+    motores se actualizan las claves existentes y se insertan las nuevas en la misma
+    transacción.
+
+    Args:
+        conn (Connection): Conexión con una transacción abierta.
+        tabla (Table): Tabla destino.
+        filas (list): Filas completas a escribir.
+        clave (str): Columna con restricción de unicidad que identifica cada fila.
+    """
+    if not filas:
+        return
+    columnas = [c.name for c in tabla.columns if c.name != clave]
+
+    if conn.dialect.name in ("sqlite", "postgresql"):
+        if conn.dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(tabla)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[tabla.c[clave]],
+            set_={columna: stmt.excluded[columna] for columna in columnas},
+        )
+        conn.execute(stmt, filas)
+        return
+
+    claves = [fila[clave] for fila in filas]
+    existentes = set(conn.execute(select(tabla.c[clave]).where(tabla.c[clave].in_(claves))).scalars())
+    nuevas = [fila for fila in filas if fila[clave] not in existentes]
+    actualizadas = [
+        {f"_{columna}": fila[columna] for columna in [clave, *columnas]}
+        for fila in filas if fila[clave] in existentes
+    ]
+    if actualizadas:
+        conn.execute(
+            tabla.update()
+            .where(tabla.c[clave] == bindparam(f"_{clave}"))
+            .values({columna: bindparam(f"_{columna}") for columna in columnas}),
+            actualizadas,
+        )
+    if nuevas:
+        conn.execute(tabla.insert(), nuevas)
@@ -0,0 +1,201 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Número de sesiones cuyo modelo de degradación se memoriza
+DEGRADATION_CACHE_SIZE = int(os.getenv("F1_DEGRADATION_CACHE_SIZE", "32"))
+
+# Vueltas mínimas para ajustar la degradación de un grupo
+MIN_VUELTAS = 3
+
+# Vueltas más lentas que este factor por la vuelta rápida de la sesión se descartan
+UMBRAL_VUELTA_RAPIDA = 1.07
+
+# Columnas necesarias para ajustar la degradación
+COLUMNAS_REQUERIDAS = ("Driver", "Compound", "TyreLife", "LapTime")
+
+# Compuesto de fastf1 -> campo de `datos_circuitos` con su compuesto Pirelli (C1-C5)
+CAMPO_COMPUESTO = {"HARD": "duro", "MEDIUM": "medio", "SOFT": "blando"}
+
+_memo: "OrderedDict[tuple, Dict]" = OrderedDict()
+_memo_lock = threading.Lock()  # El modelo se calcula en hilos del executor
+
+
+def vueltas_validas(vueltas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Selecciona las vueltas representativas del ritmo con neumáticos.
+
+    Se descartan la primera vuelta, las vueltas de entrada y salida de boxes, las
+    marcadas como no precisas, las que no son en bandera verde y las más lentas que
+    el 107% de la vuelta rápida de la sesión (coche de seguridad, tráfico, errores).
+
+    Returns:
+        pd.DataFrame: Columnas `Driver`, `Compound`, `TyreLife` y `LapSeconds`, vacío
+        si la sesión no tiene vueltas o le faltan columnas.
+    """
+    if any(columna not in vueltas.columns for columna in COLUMNAS_REQUERIDAS):
+        return pd.DataFrame({
+            "Driver": pd.Series(dtype=object),
+            "Compound": pd.Series(dtype=object),
+            "TyreLife": pd.Series(dtype=np.float64),
+            "LapSeconds": pd.Series(dtype=np.float64),
+        })
+
+    segundos = vueltas["LapTime"].dt.total_seconds().to_numpy()
+    vida = vueltas["TyreLife"].to_numpy(dtype=np.float64, na_value=np.nan)
+    mascara = np.isfinite(segundos) & np.isfinite(vida)
+    mascara &= vueltas["Compound"].notna().to_numpy() & vueltas["Driver"].notna().to_numpy()
+
+    if "LapNumber" in vueltas.columns:
+        mascara &= vueltas["LapNumber"].to_numpy(dtype=np.float64, na_value=np.nan) > 1
+    for columna in ("PitInTime", "PitOutTime"):
+        if columna in vueltas.columns:
+            mascara &= vueltas[columna].isna().to_numpy()
+    if "IsAccurate" in vueltas.columns:
+        mascara &= vueltas["IsAccurate"].fillna(False).to_numpy(dtype=bool)
+    if "TrackStatus" in vueltas.columns:
+        mascara &= (vueltas["TrackStatus"].astype(object) == "1").to_numpy()
+
+    if mascara.any():
+        mascara &= segundos <= UMBRAL_VUELTA_RAPIDA * segundos[mascara].min()
+
+    return pd.DataFrame({
+        "Driver": vueltas["Driver"].to_numpy()[mascara],
+        "Compound": vueltas["Compound"].to_numpy()[mascara],
+        "TyreLife": vida[mascara],
+        "LapSeconds": segundos[mascara],
+    })
+
+
+def ajustar_grupos(grupos: np.ndarray, x: np.ndarray, y: np.ndarray, n_grupos: int) -> Dict[str, np.ndarray]:
+    """
+    Ajusta `y = base + degradacion * x` por mínimos cuadrados para todos los grupos a la vez.
+
+    Las sumas de cada grupo se obtienen con `np.bincount`, de modo que el ajuste de
+    todos los grupos es una única pasada vectorizada sobre las vueltas.
+
+    Args:
+        grupos (np.ndarray): Código de grupo de cada vuelta (0..n_grupos-1).
+        x (np.ndarray): Vida del neumático de cada vuelta.
+        y (np.ndarray): Tiempo de vuelta en segundos.
+        n_grupos (int): Número de grupos.
+
+    Returns:
+        dict: Arrays por grupo con `vueltas`, `base`, `degradacion` y `r2`
+        (NaN en los grupos sin datos suficientes).
+    """
+    n = np.bincount(grupos, minlength=n_grupos).astype(np.float64)
+    sx = np.bincount(grupos, x, minlength=n_grupos)
+    sy = np.bincount(grupos, y, minlength=n_grupos)
+    sxx = np.bincount(grupos, x * x, minlength=n_grupos)
+    sxy = np.bincount(grupos, x * y, minlength=n_grupos)
+    syy = np.bincount(grupos, y * y, minlength=n_grupos)
+
+    denominador = n * sxx - sx * sx
+    validos = (n >= MIN_VUELTAS) & (denominador > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        degradacion = np.where(validos, (n * sxy - sx * sy) / denominador, np.nan)
+        base = np.where(validos, (sy - degradacion * sx) / n, np.nan)
+
+        residuos = y - (base[grupos] + degradacion[grupos] * x)
+        sse = np.bincount(grupos, residuos * residuos, minlength=n_grupos)
+        sst = syy - sy * sy / n
+        r2 = np.where(validos & (sst > 0), 1 - sse / sst, np.nan)
+
+    return {"vueltas": n.astype(int), "base": base, "degradacion": degradacion, "r2": r2}
+
+
+def _filas(claves: pd.DataFrame, ajuste: Dict[str, np.ndarray]) -> list:
+    """Combina las claves de cada grupo con su ajuste, omitiendo los grupos sin ajuste."""
+    filas = []
+    for i, clave in enumerate(claves.to_dict(orient="records")):
+        if np.isnan(ajuste["degradacion"][i]):
+            continue
+        filas.append({
+            **clave,
+            "vueltas": int(ajuste["vueltas"][i]),
+            "tiempo_base": round(float(ajuste["base"][i]), 3),
+            "degradacion": round(float(ajuste["degradacion"][i]), 4),
+            "r2": None if np.isnan(ajuste["r2"][i]) else round(float(ajuste["r2"][i]), 3),
+        })
+    return filas
+
+
+def modelo_degradacion(vueltas: pd.DataFrame) -> Dict:
+    """
+    Ajusta la degradación por compuesto y por piloto y compuesto para una sesión.
+
+    `degradacion` son los segundos que se pierden por vuelta de vida del neumático y
+    `tiempo_base` el tiempo de vuelta estimado con el neumático nuevo.
+
+    Returns:
+        dict: Listas `compuestos` y `pilotos` con el ajuste de cada grupo.
+    """
+    validas = vueltas_validas(vueltas)
+    x = validas["TyreLife"].to_numpy()
+    y = validas["LapSeconds"].to_numpy()
+
+    resultado = {}
+    for nombre, columnas in (("compuestos", ["Compound"]), ("pilotos", ["Driver", "Compound"])):
+        agrupadas = validas.groupby(columnas, sort=True)
+        grupos = agrupadas.ngroup().to_numpy()
+        claves = agrupadas.size().index.to_frame(index=False)
+        claves = claves.rename(columns={"Driver": "piloto", "Compound": "compuesto"})
+        ajuste = ajustar_grupos(grupos, x, y, len(claves))
+        resultado[nombre] = _filas(claves, ajuste)
+    resultado["vueltas_validas"] = len(validas)
+    return resultado
+
+
+def degradacion_memorizada(key: tuple) -> Optional[Dict]:
+    """Devuelve el modelo de degradación ya calculado de una sesión, o None si no lo está."""
+    with _memo_lock:
+        if key not in _memo:
+            return None
+        _memo.move_to_end(key)
+        return _memo[key]
+
+
+def degradacion_sesion(key: tuple, vueltas: pd.DataFrame) -> Dict:
+    """
+    Devuelve el modelo de degradación de una sesión, calculándolo solo la primera vez.
+
+    Args:
+        key (tuple): Clave de la sesión.
+        vueltas (pd.DataFrame): Vueltas completas de la sesión.
+    """
+    resultado = degradacion_memorizada(key)
+    if resultado is not None:
+        return resultado
+
+    # El ajuste se hace fuera del bloqueo; si dos hilos lo calculan a la vez, el resultado es el mismo
+    resultado = modelo_degradacion(vueltas)
+    with _memo_lock:
+        _memo[key] = resultado
+        while len(_memo) > DEGRADATION_CACHE_SIZE:
+            _memo.popitem(last=False)
+    return resultado
+
+
+def con_compuestos_pirelli(modelo: Dict, circuito: Optional[Dict]) -> Dict:
+    """
+    Añade a cada grupo el compuesto Pirelli (C1-C5) usado en el circuito.
+
+    Args:
+        modelo (dict): Resultado de `degradacion_sesion`.
+        circuito (dict, optional): Fila de `datos_circuitos` con `duro`, `medio` y `blando`.
+    """
+    def pirelli(compuesto):
+        if circuito is None or compuesto not in CAMPO_COMPUESTO:
+            return None
+        return circuito.get(CAMPO_COMPUESTO[compuesto])
+
+    return {
+        "compuestos": [{**fila, "pirelli": pirelli(fila["compuesto"])} for fila in modelo["compuestos"]],
+        "pilotos": [{**fila, "pirelli": pirelli(fila["compuesto"])} for fila in modelo["pilotos"]],
+        "vueltas_validas": modelo["vueltas_validas"],
+    }
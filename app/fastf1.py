@@ -1,6 +1,162 @@
+import asyncio
+import os
+from collections import OrderedDict
+
 import fastf1
+import numpy as np
 import pandas as pd
-import json
+
+from app.shared_cache import cache_compartida
+from app.utilidades import write_data
+
+# Número máximo de sesiones cuyas vueltas se mantienen en memoria
+SESSION_CACHE_SIZE = int(os.getenv("F1_SESSION_CACHE_SIZE", "8"))
+
+# Caché LRU de vueltas por sesión y cargas en curso (para no cargar dos veces la misma sesión)
+_session_cache: "OrderedDict[tuple, IndiceSesion]" = OrderedDict()
+_cargas_en_curso: "dict[tuple, asyncio.Future]" = {}
+
+
+def _guardar_en_cache(key: tuple, carga: asyncio.Future):
+    """Guarda en la caché el resultado de una carga terminada, aunque quien la pidió ya no espere."""
+    _cargas_en_curso.pop(key, None)
+    if carga.cancelled() or carga.exception() is not None:
+        return
+    _session_cache[key] = carga.result()
+    while len(_session_cache) > SESSION_CACHE_SIZE:
+        _session_cache.popitem(last=False)
+
+
+def compactar_vueltas(vueltas: pd.DataFrame) -> pd.DataFrame:
+    """Reduce la memoria de un DataFrame de vueltas sin perder información.
+
+    - Las columnas de texto con valores repetidos (`Driver`, `Team`, `Compound`,
+      `DriverNumber`, ...) pasan a categóricas.
+    - Las columnas de texto que solo contienen booleanos pasan a `boolean`.
+    - Los enteros se reducen al tipo más pequeño que los contiene y los `float64`
+      pasan a `float32` cuando la conversión es exacta.
+
+    Las columnas `timedelta64` se mantienen porque el resto del código opera con ellas.
+    La conversión se hace columna a columna sobre el mismo DataFrame.
+
+    Args:
+        vueltas (pd.DataFrame): Vueltas de una sesión.
+
+    Returns:
+        pd.DataFrame: El mismo DataFrame con los tipos compactados.
+    """
+    for columna in vueltas.columns:
+        serie = vueltas[columna]
+        if serie.dtype == object:
+            valores = serie.dropna()
+            if valores.empty:
+                continue
+            if valores.map(type).isin([bool, np.bool_]).all():
+                vueltas[columna] = serie.astype("boolean")
+            elif valores.map(type).eq(str).all() and valores.nunique() <= len(serie) // 2:
+                vueltas[columna] = serie.astype("category")
+        elif pd.api.types.is_integer_dtype(serie.dtype) and not pd.api.types.is_extension_array_dtype(serie.dtype):
+            vueltas[columna] = pd.to_numeric(serie, downcast="integer")
+        elif serie.dtype == np.float64:
+            reducida = serie.to_numpy().astype(np.float32)
+            if np.array_equal(reducida.astype(np.float64), serie.to_numpy(), equal_nan=True):
+                vueltas[columna] = reducida
+    return vueltas
+
+
+class IndiceSesion():
+    """Índice de las vueltas de una sesión por piloto.
+
+    Al construir el índice se calculan una sola vez las posiciones de las vueltas de
+    cada piloto, sin reordenar ni copiar la sesión. Filtrar pilotos consiste en unir
+    sus posiciones y tomar esas filas, sin recorrer la sesión completa.
+    """
+
+    def __init__(self, vueltas: pd.DataFrame):
+        """
+        Args:
+            vueltas (pd.DataFrame): Vueltas completas de la sesión.
+        """
+        self.vueltas = vueltas
+        self._orden = np.arange(0)  # Posiciones de las vueltas ordenadas (de forma estable) por piloto
+        self._rangos: "dict[str, tuple]" = {}  # Piloto -> (inicio, final) en `_orden`
+        if vueltas.empty or 'Driver' not in vueltas.columns:
+            return
+
+        codigos, pilotos = pd.factorize(vueltas['Driver'])
+        self._orden = np.argsort(codigos, kind='stable')
+        codigos = codigos[self._orden]
+
+        inicios = np.searchsorted(codigos, np.arange(len(pilotos)), side='left')
+        finales = np.searchsorted(codigos, np.arange(len(pilotos)), side='right')
+        self._rangos = {
+            piloto: (int(inicio), int(final))
+            for piloto, inicio, final in zip(pilotos, inicios, finales)
+        }
+
+    @property
+    def pilotos(self) -> list:
+        """Pilotos con vueltas en la sesión."""
+        return list(self._rangos)
+
+    def seleccionar(self, drivers: list) -> pd.DataFrame:
+        """Devuelve las vueltas de los pilotos indicados en el orden original de la sesión.
+
+        Args:
+            drivers (list): Códigos de los pilotos.
+
+        Returns:
+            pd.DataFrame: Vueltas de esos pilotos con un índice nuevo.
+        """
+        rangos = [self._rangos[piloto] for piloto in set(drivers) if piloto in self._rangos]
+        posiciones = np.concatenate([self._orden[inicio:final] for inicio, final in rangos] or [np.arange(0)])
+        if len(rangos) > 1:
+            # Con varios pilotos, las vueltas se devuelven intercaladas como en la sesión
+            posiciones.sort()
+        # Una sola copia de las filas seleccionadas
+        seleccion = self.vueltas.take(posiciones)
+        seleccion.index = pd.RangeIndex(len(posiciones))
+        return seleccion
+
+    def registros(self, drivers: list) -> list:
+        """Devuelve las vueltas de los pilotos indicados serializadas con `vueltas_a_registros`."""
+        return vueltas_a_registros(self.seleccionar(drivers))
+
+
+def _limpiar_columna(serie: pd.Series) -> list:
+    """Convierte una columna a lista de Python sustituyendo NaN, NaT e infinitos por 0."""
+    if isinstance(serie.dtype, np.dtype):
+        if serie.dtype.kind == "f":
+            valores = serie.to_numpy(dtype=np.float64, copy=True)
+            valores[~np.isfinite(valores)] = 0
+            return valores.tolist()
+        if serie.dtype.kind in "iub":
+            return serie.tolist()
+        if serie.dtype.kind == "m":
+            return serie.fillna(pd.Timedelta(0)).tolist()
+    # Tipos de pandas (`category`, `boolean`, ...) y objetos: los nulos pasan a 0
+    valores = serie.astype(object)
+    nulos = valores.isna()
+    if nulos.any():
+        valores = valores.where(~nulos, 0)
+    return valores.tolist()
+
+
+def vueltas_a_registros(vueltas: pd.DataFrame) -> list:
+    """Serializa vueltas a una lista de diccionarios con NaN, NaT e infinitos como 0.
+
+    La limpieza se hace al serializar y solo sobre las filas recibidas, sin copiar
+    el DataFrame completo de la sesión.
+
+    Args:
+        vueltas (pd.DataFrame): Vueltas a serializar.
+
+    Returns:
+        list: Un diccionario por vuelta.
+    """
+    columnas = list(vueltas.columns)
+    valores = [_limpiar_columna(vueltas[columna]) for columna in columnas]
+    return [dict(zip(columnas, fila)) for fila in zip(*valores)]
 
 
 class sesion():
@@ -20,14 +176,38 @@ class sesion():
         self.session: str = session
         self.drivers: list = drivers
         self.session_data: pd.DataFrame = None  # Datos completos de la sesión
+        self.indice: IndiceSesion = None  # Índice de las vueltas de la sesión por piloto
         self.data_filtered_pilots: pd.DataFrame = None  # Datos filtrados por piloto
 
     def __str__(self):
         """Representación en cadena de la sesión."""
         return f'Cargando la sesión {self.session} del año {self.year}'
 
-    async def load_sesion(self):
-        """Carga la sesión especificada por el usuario utilizando la biblioteca fastf1."""
+    @property
+    def key(self) -> tuple:
+        """Clave que identifica la sesión en la caché."""
+        return (int(self.year), str(self.circuit).strip().lower(), str(self.session).strip().upper())
+
+    def en_cache(self) -> bool:
+        """Indica si las vueltas de la sesión ya están cargadas en memoria."""
+        return self.key in _session_cache
+
+    def en_curso(self) -> bool:
+        """Indica si otra petición está cargando ya la sesión."""
+        return self.key in _cargas_en_curso
+
+    def _cargar(self) -> IndiceSesion:
+        """Obtiene e indexa las vueltas de la sesión (operación bloqueante).
+
+        Si hay caché compartida entre workers las vueltas se mapean desde ella y solo
+        el primer worker que las pide las descarga.
+        """
+        if cache_compartida is not None:
+            return IndiceSesion(cache_compartida.obtener(self.key, self._descargar))
+        return IndiceSesion(self._descargar())
+
+    def _descargar(self) -> pd.DataFrame:
+        """Descarga la sesión con fastf1 y devuelve sus vueltas compactadas."""
         carga_sesion = fastf1.get_session(
             self.year,
             self.circuit,
@@ -36,26 +216,47 @@ class sesion():
         carga_sesion.load()  # Carga los datos de la sesión
 
         if carga_sesion.laps is not None:
-            # Si hay vueltas registradas, las almacenamos en session_data
-            self.session_data = carga_sesion.laps.reset_index()
-        else:
-            # Si no hay vueltas, asignamos un DataFrame vacío
-            self.session_data = pd.DataFrame()
+            # Si hay vueltas registradas, las almacenamos compactadas
+            return compactar_vueltas(pd.DataFrame(carga_sesion.laps).reset_index())
+        # Si no hay vueltas, asignamos un DataFrame vacío
+        return pd.DataFrame()
+
+    async def load_sesion(self):
+        """Carga la sesión especificada por el usuario utilizando la biblioteca fastf1.
+
+        Las sesiones ya cargadas se sirven desde la caché en memoria. Si otra petición
+        está cargando la misma sesión se espera a su resultado en lugar de repetir la carga.
+        """
+        key = self.key
+        if key in _session_cache:
+            _session_cache.move_to_end(key)
+            self._usar_indice(_session_cache[key])
+            return
+
+        if key in _cargas_en_curso:
+            self._usar_indice(await asyncio.shield(_cargas_en_curso[key]))
+            return
+
+        # La carga se ejecuta en un hilo para no bloquear el bucle de eventos
+        loop = asyncio.get_running_loop()
+        carga = loop.run_in_executor(None, self._cargar)
+        _cargas_en_curso[key] = carga
+        carga.add_done_callback(lambda futuro: _guardar_en_cache(key, futuro))
+
+        self._usar_indice(await asyncio.shield(carga))
         print("Contenido de `session_data`:", self.session_data)
 
+    def _usar_indice(self, indice: IndiceSesion):
+        self.indice = indice
+        self.session_data = indice.vueltas
+
     async def filter_by_driver(self):
         """Filtra las vueltas por los nombres de los pilotos especificados."""
         if self.session_data is not None and not self.session_data.empty:
-            # Filtrar las vueltas por los pilotos
-            self.data_filtered_pilots = self.session_data[self.session_data['Driver'].isin(
-                self.drivers)]
-            # Resetear el índice
-            self.data_filtered_pilots.reset_index(drop=True, inplace=True)
-
-            # Manejar NaN y valores infinitos
-            self.data_filtered_pilots = self.data_filtered_pilots.fillna(0)  # Reemplaza NaN con 0
-            self.data_filtered_pilots = self.data_filtered_pilots.replace(
-                [float('inf'), float('-inf')], 0)  # Reemplaza valores infinitos con 0
+            # Tomar las vueltas de los pilotos (con un índice nuevo)
+            self.data_filtered_pilots = self.indice.seleccionar(self.drivers)
+
+            # Los NaN y valores infinitos se limpian al serializar con `vueltas_a_registros`
             print("Contenido de `SesionState.data_filtered_pilots`:",
                 self.data_filtered_pilots)
         else:
@@ -88,8 +289,7 @@ class sesion():
         if self.data_filtered_pilots is not None and not self.data_filtered_pilots.empty:
             for var in variables_to_change:
                 self.data_filtered_pilots[var] = self.data_filtered_pilots[var].apply(
-                    lambda x: f"{int(x.total_seconds(
-                    ) // 60)}:{x.total_seconds() % 60:.3f}" if pd.notnull(x) else None
+                    lambda x: f"{int(x.total_seconds() // 60)}:{x.total_seconds() % 60:.3f}" if pd.notnull(x) else None
                 )
             print("Unidades de tiempo cambiadas a minutos y segundos para las variables:",
                   variables_to_change)
@@ -97,8 +297,14 @@ class sesion():
             print("Error: No hay datos filtrados disponibles para modificar. Asegúrate de ejecutar `filter_by_driver` primero.")
 
     async def data_to_json(self):
-        """Convierte `data_filtered_pilots` a JSON y lo guarda en un archivo."""
+        """Convierte `data_filtered_pilots` a ítems y los guarda en el almacén local."""
         if self.data_filtered_pilots is not None and not self.data_filtered_pilots.empty:
+            # NaN, NaT e infinitos a 0, igual que en las respuestas de la API
+            self.data_filtered_pilots = pd.DataFrame(
+                {columna: _limpiar_columna(self.data_filtered_pilots[columna])
+                 for columna in self.data_filtered_pilots.columns},
+                index=self.data_filtered_pilots.index,
+            )
             # Eliminar columnas innecesarias
             await self._drop_tables()
             # Cambiar las unidades de tiempo
@@ -123,9 +329,8 @@ class sesion():
                 }, axis=1
             ).tolist()
 
-            # Guardar el archivo JSON
-            with open("data/data_filtered_pilots.json", "w", encoding="utf-8") as f:
-                json.dump(json_data, f, indent=4, ensure_ascii=False)
-            print("Archivo JSON guardado en: app/data/data_filtered_pilots.json")
+            # Guardar los ítems en el almacén local
+            write_data(json_data)
+            print("Ítems guardados en la tabla `items_pilotos`:", len(json_data))
         else:
             print("Error: No hay datos filtrados disponibles para guardar. Asegúrate de ejecutar `filter_by_driver` primero.")
@@ -0,0 +1,414 @@
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+from app.admission import limitador_sesiones
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Configuración de los trabajos de carga de sesiones
+JOB_WORKERS = int(os.getenv("F1_JOB_WORKERS", "2"))  # Trabajadores que ejecutan cargas en cada proceso
+JOB_QUEUE_SIZE = int(os.getenv("F1_JOB_QUEUE_SIZE", "32"))  # Trabajos pendientes como máximo
+JOB_RESULTS_SIZE = int(os.getenv("F1_JOB_RESULTS_SIZE", "64"))  # Trabajos terminados que se conservan
+JOB_TTL = float(os.getenv("F1_JOB_TTL_SECONDS", "900"))  # Segundos que se conserva un trabajo terminado
+JOB_POLL = float(os.getenv("F1_JOB_POLL_SECONDS", "0.5"))  # Espera entre consultas de trabajos pendientes
+JOB_CLAIM_TIMEOUT = float(os.getenv("F1_JOB_CLAIM_TIMEOUT_SECONDS", "1800"))  # Trabajo abandonado
+
+# Estados de un trabajo y progreso asociado
+PENDIENTE = "pendiente"
+CARGANDO = "cargando"
+FILTRANDO = "filtrando"
+COMPLETADO = "completado"
+ERROR = "error"
+
+PROGRESO = {PENDIENTE: 0.0, CARGANDO: 0.1, FILTRANDO: 0.8, COMPLETADO: 1.0, ERROR: 1.0}
+EN_CURSO = (CARGANDO, FILTRANDO)
+
+
+class Trabajo():
+    """Carga de una sesión de F1 ejecutada en segundo plano."""
+
+    def __init__(self, year: int, circuit: str, session: str, drivers: List[str], usuario: str = "jobs"):
+        self.id = uuid.uuid4().hex
+        self.year = year
+        self.circuit = circuit
+        self.session = session
+        self.drivers = drivers
+        self.usuario = usuario  # Clave del limitador de admisión
+        self.estado = PENDIENTE
+        self.resultado: Optional[list] = None
+        self.error: Optional[str] = None
+        self.codigo: Optional[int] = None  # Código HTTP del error
+        self.creado = time.time()
+        self.terminado: Optional[float] = None
+
+    @property
+    def clave(self) -> str:
+        """Clave para deduplicar trabajos que piden los mismos datos."""
+        return json.dumps([
+            int(self.year), self.circuit.strip().lower(), self.session.strip().upper(),
+            sorted(set(self.drivers)),
+        ])
+
+    @property
+    def finalizado(self) -> bool:
+        return self.estado in (COMPLETADO, ERROR)
+
+    def to_dict(self) -> dict:
+        """Estado del trabajo sin el resultado."""
+        return {
+            "job_id": self.id,
+            "status": self.estado,
+            "progress": PROGRESO[self.estado],
+            "year": self.year,
+            "circuit": self.circuit,
+            "session": self.session,
+            "drivers": self.drivers,
+            "error": self.error,
+        }
+
+    def to_row(self) -> Dict:
+        """Fila de la tabla `trabajos` para un trabajo nuevo."""
+        return {
+            "id": self.id,
+            "clave": self.clave,
+            "clave_activa": self.clave,
+            "year": int(self.year),
+            "circuit": self.circuit,
+            "session": self.session,
+            "drivers": json.dumps(self.drivers),
+            "usuario": self.usuario,
+            "estado": self.estado,
+            "creado": self.creado,
+        }
+
+    @classmethod
+    def from_row(cls, fila) -> "Trabajo":
+        """Reconstruye un trabajo a partir de su fila en la tabla `trabajos`."""
+        trabajo = cls(fila.year, fila.circuit, fila.session, json.loads(fila.drivers), fila.usuario)
+        trabajo.id = fila.id
+        trabajo.estado = fila.estado
+        trabajo.error = fila.error
+        trabajo.codigo = fila.codigo
+        trabajo.creado = fila.creado
+        trabajo.terminado = fila.terminado
+        if fila.resultado is not None:
+            trabajo.resultado = json.loads(fila.resultado)
+        return trabajo
+
+
+class GestorTrabajos():
+    """
+    Cola de trabajos de carga de sesiones compartida por todos los workers de la API.
+
+    Los trabajos, su estado y sus resultados se guardan en la tabla `trabajos` de la base
+    de datos local (`LOCAL_DB_URL`), de modo que cualquier worker puede encolar, consultar
+    o ejecutar cualquier trabajo. Cada proceso arranca `trabajadores` tareas que reclaman
+    los trabajos pendientes con una actualización condicionada al estado, por lo que cada
+    trabajo lo ejecuta un solo trabajador.
+
+    Los trabajos terminados se conservan como máximo `max_resultados` durante `ttl`
+    segundos. Un trabajo en curso o completado se reutiliza para peticiones con la misma
+    sesión y pilotos, también entre workers.
+    """
+
+    def __init__(self, trabajadores: int, max_pendientes: int, max_resultados: int, ttl: float):
+        """
+        Args:
+            trabajadores (int): Cargas que se ejecutan a la vez en cada proceso.
+            max_pendientes (int): Trabajos que pueden esperar en la cola.
+            max_resultados (int): Trabajos terminados que se conservan.
+            ttl (float): Segundos que se conserva un trabajo terminado.
+        """
+        self.trabajadores = trabajadores
+        self.max_pendientes = max_pendientes
+        self.max_resultados = max_resultados
+        self.ttl = ttl
+        self.identificador = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._tabla = None
+        self._creada = False
+        self._creacion = threading.Lock()  # Los trabajadores acceden a la base de datos desde hilos
+        self._aviso: Optional[asyncio.Event] = None  # Despierta a los trabajadores locales
+        self._tareas: List[asyncio.Task] = []
+
+    @property
+    def tabla(self):
+        """Tabla `trabajos` (`sqlalchemy.Table`), definida en el primer uso."""
+        if self._tabla is None:
+            from sqlalchemy import Table, Column, Integer, Float, String, Text, Index
+            from app.database import metadata
+
+            if "trabajos" in metadata.tables:
+                self._tabla = metadata.tables["trabajos"]
+                return self._tabla
+            self._tabla = Table(
+                "trabajos", metadata,
+                Column("id", String, primary_key=True),
+                Column("clave", String, nullable=False),
+                Column("clave_activa", String, unique=True),  # Clave mientras el trabajo es reutilizable
+                Column("year", Integer, nullable=False),
+                Column("circuit", String, nullable=False),
+                Column("session", String, nullable=False),
+                Column("drivers", Text, nullable=False),  # Lista de pilotos en JSON
+                Column("usuario", String, nullable=False),
+                Column("estado", String, nullable=False),
+                Column("trabajador", String),  # Worker que ejecuta el trabajo
+                Column("reclamado", Float),
+                Column("error", Text),
+                Column("codigo", Integer),
+                Column("resultado", Text),  # Registros en JSON
+                Column("creado", Float, nullable=False),
+                Column("terminado", Float),
+                Index("ix_trabajos_estado_creado", "estado", "creado"),
+            )
+        return self._tabla
+
+    def _engine(self):
+        from app.database import metadata, get_engine
+
+        engine = get_engine()
+        if not self._creada:
+            with self._creacion:
+                if not self._creada:
+                    self._crear_tabla(engine, metadata)
+                    self._creada = True
+        return engine
+
+    def _crear_tabla(self, engine, metadata):
+        """Crea la tabla si no existe, tolerando que otro worker la cree a la vez."""
+        from sqlalchemy import inspect
+        from sqlalchemy.exc import DatabaseError
+
+        try:
+            metadata.create_all(engine, tables=[self.tabla])
+        except DatabaseError:
+            if not inspect(engine).has_table("trabajos"):
+                raise
+
+    async def _en_hilo(self, funcion, *args):
+        """Ejecuta una operación de base de datos en un hilo para no bloquear el bucle."""
+        return await asyncio.get_running_loop().run_in_executor(None, funcion, *args)
+
+    async def iniciar(self):
+        """Arranca los trabajadores de este proceso en el bucle de eventos actual."""
+        self._aviso = asyncio.Event()
+        self._tareas = [asyncio.create_task(self._trabajador()) for _ in range(self.trabajadores)]
+
+    async def detener(self):
+        """Cancela los trabajadores."""
+        for tarea in self._tareas:
+            tarea.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        self._tareas = []
+
+    def _purgar(self, conn):
+        """
+        Elimina los trabajos terminados caducados o que exceden el tamaño del almacén y
+        devuelve a la cola los trabajos reclamados por un worker que ya no responde.
+        """
+        from sqlalchemy import select, delete, update
+
+        tabla = self.tabla
+        ahora = time.time()
+        terminados = tabla.c.estado.in_((COMPLETADO, ERROR))
+        conn.execute(delete(tabla).where(terminados, tabla.c.terminado < ahora - self.ttl))
+        # Fecha de fin del primer trabajo que ya no cabe en el almacén
+        corte = conn.execute(
+            select(tabla.c.terminado).where(terminados)
+            .order_by(tabla.c.terminado.desc()).offset(self.max_resultados).limit(1)
+        ).scalar()
+        if corte is not None:
+            conn.execute(delete(tabla).where(terminados, tabla.c.terminado <= corte))
+        conn.execute(
+            update(tabla)
+            .where(tabla.c.estado.in_(EN_CURSO), tabla.c.reclamado < ahora - JOB_CLAIM_TIMEOUT)
+            .values(estado=PENDIENTE, trabajador=None, reclamado=None)
+        )
+
+    def _enviar(self, trabajo: Trabajo) -> Trabajo:
+        from sqlalchemy import select, func
+        from sqlalchemy.exc import IntegrityError
+
+        tabla = self.tabla
+        with self._engine().begin() as conn:
+            self._purgar(conn)
+
+        for _ in range(3):
+            with self._engine().begin() as conn:
+                existente = conn.execute(select(tabla).where(tabla.c.clave_activa == trabajo.clave)).first()
+                if existente is not None:
+                    return Trabajo.from_row(existente)
+
+                pendientes = conn.execute(
+                    select(func.count()).select_from(tabla).where(tabla.c.estado == PENDIENTE)
+                ).scalar_one()
+                if pendientes >= self.max_pendientes:
+                    raise HTTPException(
+                        status_code=503,
+                        detail="La cola de trabajos está llena. Inténtalo de nuevo más tarde.",
+                        headers={"Retry-After": "30"},
+                    )
+            try:
+                with self._engine().begin() as conn:
+                    conn.execute(tabla.insert(), [trabajo.to_row()])
+                return trabajo
+            except IntegrityError:
+                # Otro worker ha encolado el mismo trabajo a la vez: se reutiliza el suyo
+                continue
+        raise HTTPException(status_code=503, detail="No se pudo encolar el trabajo. Inténtalo de nuevo.")
+
+    async def enviar(self, year: int, circuit: str, session: str, drivers: List[str],
+                     usuario: str = "jobs") -> Trabajo:
+        """
+        Encola la carga de una sesión o devuelve el trabajo existente para los mismos datos.
+
+        Args:
+            usuario (str): Clave del usuario en el limitador de admisión.
+
+        Raises:
+            HTTPException: `503` si la cola de trabajos está llena.
+        """
+        trabajo = await self._en_hilo(self._enviar, Trabajo(year, circuit, session, drivers, usuario))
+        if self._aviso is not None:
+            self._aviso.set()
+        return trabajo
+
+    def _obtener(self, job_id: str) -> Optional[Trabajo]:
+        from sqlalchemy import select
+
+        with self._engine().begin() as conn:
+            self._purgar(conn)
+            fila = conn.execute(select(self.tabla).where(self.tabla.c.id == job_id)).first()
+        return Trabajo.from_row(fila) if fila is not None else None
+
+    async def obtener(self, job_id: str) -> Optional[Trabajo]:
+        """Devuelve el trabajo con el id indicado, o None si no existe o ha caducado."""
+        return await self._en_hilo(self._obtener, job_id)
+
+    def _reclamar(self) -> Optional[Trabajo]:
+        """Reclama el trabajo pendiente más antiguo para este proceso, si lo hay."""
+        from sqlalchemy import select, update
+
+        tabla = self.tabla
+        with self._engine().begin() as conn:
+            candidatos = conn.execute(
+                select(tabla.c.id).where(tabla.c.estado == PENDIENTE).order_by(tabla.c.creado).limit(5)
+            ).scalars().all()
+            for job_id in candidatos:
+                reclamado = conn.execute(
+                    update(tabla)
+                    .where(tabla.c.id == job_id, tabla.c.estado == PENDIENTE)
+                    .values(estado=CARGANDO, trabajador=self.identificador, reclamado=time.time())
+                )
+                if reclamado.rowcount == 1:
+                    return Trabajo.from_row(conn.execute(select(tabla).where(tabla.c.id == job_id)).one())
+        return None
+
+    def _actualizar(self, trabajo: Trabajo, estado: str):
+        """Guarda el estado del trabajo y, si ha terminado, su resultado o su error."""
+        from sqlalchemy import update
+
+        trabajo.estado = estado
+        valores = {"estado": estado, "reclamado": time.time()}
+        if trabajo.finalizado:
+            trabajo.terminado = time.time()
+            valores.update(
+                terminado=trabajo.terminado,
+                error=trabajo.error,
+                codigo=trabajo.codigo,
+                resultado=None if trabajo.resultado is None else json.dumps(jsonable_encoder(trabajo.resultado)),
+            )
+            if estado == ERROR:
+                # Un trabajo fallido no se reutiliza: la siguiente petición lo reintenta
+                valores["clave_activa"] = None
+        with self._engine().begin() as conn:
+            conn.execute(
+                update(self.tabla)
+                .where(self.tabla.c.id == trabajo.id, self.tabla.c.trabajador == self.identificador)
+                .values(**valores)
+            )
+
+    async def _trabajador(self):
+        while True:
+            try:
+                trabajo = await self._en_hilo(self._reclamar)
+            except Exception as e:
+                print(f"Error reclamando trabajos: {str(e)}")
+                trabajo = None
+
+            if trabajo is None:
+                # Sin trabajos: esperar un aviso local o a la siguiente consulta
+                self._aviso.clear()
+                try:
+                    await asyncio.wait_for(self._aviso.wait(), JOB_POLL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._ejecutar(trabajo)
+
+    async def _cargar(self, trabajo: Trabajo, f1_session):
+        """
+        Carga la sesión de un trabajo con turno del limitador de admisión.
+
+        Las cargas de los trabajos comparten el límite de cargas simultáneas con
+        `/f1/session`. Si la cola del limitador está llena se espera el `Retry-After`
+        y se vuelve a pedir turno en lugar de dar el trabajo por fallido.
+        """
+        if f1_session.en_cache() or f1_session.en_curso():
+            await f1_session.load_sesion()
+            return
+
+        while True:
+            try:
+                async with limitador_sesiones.turno(trabajo.usuario):
+                    await f1_session.load_sesion()
+                return
+            except HTTPException as e:
+                if e.status_code != 503:
+                    raise
+                await asyncio.sleep(float((e.headers or {}).get("Retry-After", 1)))
+
+    async def _ejecutar(self, trabajo: Trabajo):
+        """Ejecuta el pipeline de `sesion` para un trabajo."""
+        # Importación diferida: fastf1 y pandas solo se cargan al usar los endpoints F1
+        from app.fastf1 import sesion, vueltas_a_registros
+
+        try:
+            f1_session = sesion(trabajo.year, trabajo.circuit, trabajo.session, trabajo.drivers)
+            await self._cargar(trabajo, f1_session)
+
+            await self._en_hilo(self._actualizar, trabajo, FILTRANDO)
+            await f1_session.filter_by_driver()
+
+            datos = f1_session.data_filtered_pilots
+            if datos is None or datos.empty:
+                trabajo.error = (
+                    f"No se encontraron datos para los pilotos especificados ({', '.join(trabajo.drivers)})."
+                )
+                trabajo.codigo = 404
+                await self._en_hilo(self._actualizar, trabajo, ERROR)
+                return
+
+            trabajo.resultado = vueltas_a_registros(datos)
+            await self._en_hilo(self._actualizar, trabajo, COMPLETADO)
+        except Exception as e:
+            trabajo.error = f"Error al cargar los datos de la sesión: {str(e)}"
+            trabajo.codigo = 500
+            try:
+                await self._en_hilo(self._actualizar, trabajo, ERROR)
+            except Exception as e:
+                print(f"Error guardando el trabajo {trabajo.id}: {str(e)}")
+
+
+# Gestor compartido de trabajos de carga de sesiones
+gestor_trabajos = GestorTrabajos(JOB_WORKERS, JOB_QUEUE_SIZE, JOB_RESULTS_SIZE, JOB_TTL)
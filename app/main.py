@@ -1,16 +1,24 @@
+import asyncio
+import json
 import os
+from contextlib import asynccontextmanager
 from typing import List, Optional
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, Depends, HTTPException, Query, Body
+from fastapi import FastAPI, Depends, HTTPException, Query, Body, Request
 from fastapi.params import Path
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from supabase import create_client
+from supabase import create_client, Client
 
-from app.fastf1 import sesion
+from app import replica
+from app.admission import limitador_sesiones, clave_usuario
+from app.jobs import gestor_trabajos, COMPLETADO, ERROR
 from app.models import *
 from app.routes.oauth import (
     get_current_user, 
+    get_optional_user,
     create_access_token, 
     verify_password, 
     get_password_hash, 
@@ -26,11 +34,54 @@ load_dotenv()
 # Configuración de Supabase
 SUPABASE_URL = os.getenv("SUPABASE_URL")  # URL de Supabase
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")  # Clave de la API de Supabase
-# Crear cliente de Supabase
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+SUPABASE_URL_DATOS = os.getenv("SUPABASE_URL_DATOS")  # URL de Supabase con los datos de circuitos
+SUPABASE_KEY_DATOS = os.getenv("SUPABASE_KEY_DATOS")  # Clave de la API de datos de circuitos
+F1_BATCH_MAX_SPECS = int(os.getenv("F1_BATCH_MAX_SPECS", "100"))  # Peticiones máximas por lote
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Crea los clientes de Supabase al arrancar la aplicación.
+
+    Los clientes se construyen una sola vez por proceso y se comparten entre
+    peticiones a través de `app.state`, en lugar de crearse al importar el módulo
+    o en cada petición.
+    """
+    app.state.supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    app.state.supabase_datos = None
+    if SUPABASE_URL_DATOS and SUPABASE_KEY_DATOS:
+        app.state.supabase_datos = create_client(SUPABASE_URL_DATOS, SUPABASE_KEY_DATOS)
+
+    # Sincronización periódica de la réplica local de lectura
+    tarea_replica = None
+    if replica.REPLICA_ENABLED:
+        tarea_replica = asyncio.create_task(
+            replica.sincronizar_periodicamente(app.state.supabase, app.state.supabase_datos)
+        )
+    await gestor_trabajos.iniciar()
+    yield
+    await gestor_trabajos.detener()
+    if tarea_replica is not None:
+        tarea_replica.cancel()
+        try:
+            await tarea_replica
+        except asyncio.CancelledError:
+            pass
+
 
 # Crear la aplicación FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+
+def get_supabase(request: Request) -> Client:
+    """Devuelve el cliente de Supabase de usuarios creado en el arranque."""
+    return request.app.state.supabase
+
+
+def get_supabase_datos(request: Request) -> Optional[Client]:
+    """Devuelve el cliente de Supabase de circuitos creado en el arranque."""
+    return request.app.state.supabase_datos
 
 
 @app.get("/")
@@ -53,60 +104,189 @@ def read_root():
                                 ####### 
 
 @app.get("/f1/session", tags=["F1"])
-async def get_f1_session(year: int, circuit: str, session: str, drivers: str):
+async def get_f1_session(
+    year: int, circuit: str, session: str, drivers: str,
+    request: Request,
+    current_user: Optional[dict] = Depends(get_optional_user)
+):
     """
     Endpoint para obtener datos de una sesión de Fórmula 1.
+
+    Las sesiones que no están en caché ni cargándose se cargan con turno del limitador de admisión,
+    repartido por usuario. Si la cola está llena se responde `503` con `Retry-After`.
     """
+    # Importación diferida: fastf1 y pandas solo se cargan al usar los endpoints F1
+    from app.fastf1 import sesion, vueltas_a_registros
+
     try:
         driver_list = drivers.split(',')
         f1_session = sesion(year, circuit, session, driver_list)
-        await f1_session.load_sesion()
+        if f1_session.en_cache() or f1_session.en_curso():
+            await f1_session.load_sesion()
+        else:
+            async with limitador_sesiones.turno(clave_usuario(request, current_user)):
+                await f1_session.load_sesion()
         await f1_session.filter_by_driver()
 
         # Validar si hay datos después del filtro
         if f1_session.data_filtered_pilots is not None and not f1_session.data_filtered_pilots.empty:
-            # Limpieza adicional del DataFrame
-            clean_data = f1_session.data_filtered_pilots.fillna(0).replace(
-                [float('inf'), float('-inf')], 0
-            )
             return {
                 "message": "Datos obtenidos exitosamente",
-                "data": clean_data.to_dict(orient="records"),
+                "data": vueltas_a_registros(f1_session.data_filtered_pilots),
             }
         else:
             raise HTTPException(
                 status_code=404,
                 detail=f"No se encontraron datos para los pilotos especificados ({', '.join(driver_list)}). Verifica el nombre del piloto o los parámetros de la sesión."
             )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error al cargar los datos de la sesión: {str(e)}"
         )
-    
+
+
+@app.get("/f1/session/degradacion", tags=["F1"])
+async def get_f1_session_degradation(
+    year: int, circuit: str, session: str,
+    request: Request,
+    circuito: Optional[str] = Query(None, description="Nombre del circuito en datos_circuitos; por defecto, `circuit`"),
+    current_user: Optional[dict] = Depends(get_optional_user),
+    supabase_datos: Optional[Client] = Depends(get_supabase_datos)
+):
+    """
+    Endpoint para obtener el modelo de degradación de neumáticos de una sesión.
+
+    Ajusta el tiempo de vuelta frente a la vida del neumático por compuesto y por piloto y
+    compuesto, sin vueltas de entrada y salida de boxes ni vueltas lentas. Cada compuesto
+    se acompaña de su equivalente Pirelli (C1-C5) según `datos_circuitos`.
+    """
+    # Importación diferida: fastf1, pandas y numpy solo se cargan al usar los endpoints F1
+    from app.fastf1 import sesion
+    from app.degradation import degradacion_memorizada, degradacion_sesion, con_compuestos_pirelli
+
+    try:
+        f1_session = sesion(year, circuit, session, [])
+        loop = asyncio.get_running_loop()
+
+        # Con el modelo memorizado no hace falta cargar la sesión ni pedir turno
+        modelo = degradacion_memorizada(f1_session.key)
+        if modelo is None:
+            if f1_session.en_cache() or f1_session.en_curso():
+                await f1_session.load_sesion()
+            else:
+                async with limitador_sesiones.turno(clave_usuario(request, current_user)):
+                    await f1_session.load_sesion()
+
+            modelo = await loop.run_in_executor(
+                None, degradacion_sesion, f1_session.key, f1_session.indice.vueltas
+            )
+        if not modelo["compuestos"]:
+            raise HTTPException(
+                status_code=404,
+                detail="No hay vueltas suficientes para ajustar la degradación en la sesión especificada."
+            )
+
+        # Compuestos Pirelli del circuito; sin ellos se devuelve el modelo igualmente
+        nombre = circuito or circuit
+
+        def compuestos_circuito():
+            # Consulta bloqueante (réplica local o Supabase): se ejecuta en el executor
+            if replica.circuitos.disponible():
+                return replica.circuitos.leer(circuito=nombre)
+            supabase_circuit = SupabaseDataCircuit(tabla="datos_circuitos", select="*", client=supabase_datos)
+            return supabase_circuit.fetch_data_by_circuit(nombre).data
+
+        datos_circuito = None
+        try:
+            datos_circuito = await loop.run_in_executor(None, compuestos_circuito)
+        except Exception as e:
+            print(f"No se pudieron obtener los compuestos del circuito {nombre}: {str(e)}")
+
+        return {
+            "message": "Datos obtenidos exitosamente",
+            "data": con_compuestos_pirelli(modelo, datos_circuito[0] if datos_circuito else None),
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al calcular la degradación de la sesión: {str(e)}"
+        )
+
+
+@app.get("/f1/jobs/{job_id}", tags=["F1"])
+async def get_f1_job(job_id: str):
+    """
+    Endpoint para consultar el estado y el progreso de un trabajo de carga de sesión.
+    """
+    trabajo = await gestor_trabajos.obtener(job_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail=f"No se encontró el trabajo {job_id} o ha caducado.")
+    return trabajo.to_dict()
+
+
+@app.get("/f1/jobs/{job_id}/result", tags=["F1"])
+async def get_f1_job_result(job_id: str):
+    """
+    Endpoint para obtener los datos de un trabajo de carga de sesión terminado.
+
+    Mientras el trabajo no ha terminado se responde `202` con su estado.
+    """
+    trabajo = await gestor_trabajos.obtener(job_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail=f"No se encontró el trabajo {job_id} o ha caducado.")
+    if trabajo.estado == ERROR:
+        raise HTTPException(status_code=trabajo.codigo or 500, detail=trabajo.error)
+    if trabajo.estado != COMPLETADO:
+        return JSONResponse(status_code=202, content=trabajo.to_dict())
+    return {
+        "message": "Datos obtenidos exitosamente",
+        "data": trabajo.resultado,
+    }
+
+
 @app.get("/f1/circuitos/campos", tags=["F1"])
 def get_custom_fields_for_circuits(
     circuito: Optional[str] = Query(None, description="Nombre del circuito"),
-    fields: Optional[List[str]] = Query(None, description="Campos deseados")
+    fields: Optional[List[str]] = Query(None, description="Campos deseados"),
+    filtros: Optional[List[str]] = Query(
+        None, description="Filtros campo:operador:valor con operador gt, lt, eq o in (p. ej. longitud:gt:5.5, duro:in:c1,c2)"
+    ),
+    sort: Optional[str] = Query(None, description="Campo por el que ordenar; con '-' delante, descendente"),
+    limit: Optional[int] = Query(None, description="Número máximo de circuitos"),
+    supabase_datos: Optional[Client] = Depends(get_supabase_datos)
 ):
     """
     Endpoint para obtener datos personalizados de un circuito basado en los campos solicitados.
+
+    Los filtros, el orden y el límite se aplican en la consulta a Supabase o, con la réplica
+    local activa, con operaciones vectorizadas sobre una copia en columnas de los circuitos.
     """
-    try:
-        # Inicializar conexión a Supabase
-        supabase_circuit = SupabaseDataCircuit(tabla="datos_circuitos", select="*")
-        response = supabase_circuit.fetch_data()
+    # Importación diferida: numpy solo se carga al consultar circuitos
+    from app.circuit_query import ConsultaCircuitos, columnas_desde_replica
 
-        if not response.data:
-            raise HTTPException(status_code=404, detail="No se encontraron datos de circuitos.")
+    try:
+        consulta = ConsultaCircuitos.desde_parametros(circuito, filtros, sort, limit)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
 
-        # Filtrar por circuito si está definido
-        circuitos = response.data
-        if circuito:
-            circuitos = [c for c in circuitos if c.get("circuito") == circuito]
+    try:
+        if replica.circuitos.disponible():
+            # Evaluar sobre la réplica local
+            circuitos = columnas_desde_replica(replica.circuitos).seleccionar(consulta)
+        else:
+            # Inicializar conexión a Supabase
+            supabase_circuit = SupabaseDataCircuit(tabla="datos_circuitos", select="*", client=supabase_datos)
+            circuitos = supabase_circuit.fetch_data_query(consulta).data
 
         if not circuitos:
-            raise HTTPException(status_code=404, detail=f"No se encontraron datos para el circuito {circuito}.")
+            if circuito:
+                raise HTTPException(status_code=404, detail=f"No se encontraron datos para el circuito {circuito}.")
+            raise HTTPException(status_code=404, detail="No se encontraron datos de circuitos.")
 
         # Si se solicitan campos específicos, filtrar los datos
         if fields:
@@ -118,6 +298,8 @@ def get_custom_fields_for_circuits(
             "message": "Datos obtenidos exitosamente",
             "data": circuitos
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener datos: {str(e)}")
 
@@ -135,23 +317,38 @@ def get_custom_fields_for_circuits(
 
 
 @app.get("/users/me", tags=["Usuarios"])
-def read_users_me(current_user: str = Depends(get_current_user), tags=["Usuarios"]):
+def read_users_me(
+    current_user: str = Depends(get_current_user), tags=["Usuarios"],
+    supabase: Client = Depends(get_supabase)
+):
 
-    response = supabase.table("users").select("*").eq("email", current_user).execute()
+    usuarios = []
+    if replica.usuarios.disponible():
+        usuarios = replica.usuarios.leer(email=current_user["sub"])
+    if not usuarios:
+        # Usuarios recién registrados pueden no estar aún en la réplica
+        usuarios = supabase.table("users").select("*").eq("email", current_user["sub"]).execute().data
 
-    if not response.data:
+    if not usuarios:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    return response.data[0]
+    # Misma respuesta desde la réplica y desde Supabase: sin el hash de la contraseña
+    return {k: v for k, v in usuarios[0].items() if k != "password"}
 
 # Operaciones relacionadas con usuarios desde Supabase
 @app.get("/users/supabase", tags=["Usuarios"])
-async def get_niks_from_supabase(current_user: str = Depends(get_current_user)):
+async def get_niks_from_supabase(
+    current_user: str = Depends(get_current_user),
+    supabase: Client = Depends(get_supabase)
+):
     """
     Devuelve todos los nick de la base de datos
     """
     try:
-        supabase_client = SupabaseAPI("users", "nick")
-        users = supabase_client.fetch_data()
+        if replica.usuarios.disponible():
+            users = [{"nick": user.get("nick")} for user in replica.usuarios.leer()]
+        else:
+            supabase_client = SupabaseAPI("users", "nick", client=supabase)
+            users = supabase_client.fetch_data().data
         if not users:
             return {"message": "No se encontraron usuarios", "data": []}
         return {"message": "Usuarios obtenidos exitosamente", "data": users}
@@ -169,7 +366,8 @@ async def get_niks_from_supabase(current_user: str = Depends(get_current_user)):
 @app.put("/users/{nick}", tags=["Usuarios"])
 async def update_user(
     nick: str, user_update: UserUpdate, 
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    supabase: Client = Depends(get_supabase)
 ):
     """
     Actualiza la información de un usuario utilizando el nick como identificador único.
@@ -182,11 +380,13 @@ async def update_user(
             raise HTTPException(status_code=400, detail="No se proporcionaron datos para actualizar")
         
         # Conexión a la base de datos
-        supabase_client = SupabaseAPI(tabla="users", select="*")
+        supabase_client = SupabaseAPI(tabla="users", select="*", client=supabase)
         response = supabase_client.update_user(nick, update_data)
 
         if not response.data:
             raise HTTPException(status_code=404, detail=f"No se encontró usuario con nick: {nick}")
+        # El email (clave de la réplica) puede haber cambiado
+        replica.usuarios.aplicar(response.data, reemplaza={"nick": nick})
 
         # Manipula los datos devueltos para eliminar "nick"
         updated_data = response.data[0]
@@ -202,14 +402,16 @@ async def update_user(
 
 @app.put("/f1/calendar/update/{circuit_name}", tags=["F1"])
 def update_f1_calendar(
-    circuit_name: str, update_data: RaceData = Body(...), current_user: dict = Depends(verify_admin_role)
+    circuit_name: str, update_data: RaceData = Body(...), current_user: dict = Depends(verify_admin_role),
+    supabase_datos: Optional[Client] = Depends(get_supabase_datos)
 ):
     """
     Endpoint para actualizar información de un circuito dado su nombre.
     """
     try:
-        supabase_circuit = SupabaseDataCircuit(tabla="datos_circuitos")
+        supabase_circuit = SupabaseDataCircuit(tabla="datos_circuitos", client=supabase_datos)
         response = supabase_circuit.update_circuit_information(circuit_name, update_data.dict())
+        replica.circuitos.aplicar(response)
         return {"message": "Información del circuito actualizada exitosamente", "data": response}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -222,6 +424,7 @@ async def change_password(
     current_password: str = Body(..., embed=True),
     new_password: str = Body(..., embed=True),
     current_user: dict = Depends(get_current_user),
+    supabase: Client = Depends(get_supabase),
 ):
     """
     Endpoint para cambiar la contraseña de un usuario autenticado.
@@ -256,6 +459,7 @@ async def change_password(
 
         if not update_response.data:
             raise HTTPException(status_code=500, detail="Error al actualizar la contraseña en la base de datos")
+        replica.usuarios.aplicar(update_response.data)
 
         print("Respuesta de actualización completa:", update_response)
         return {"message": "Contraseña actualizada exitosamente"}
@@ -281,7 +485,8 @@ def register_user(
     gender: str,
     email: str,
     password: str,
-    role:str="user"
+    role:str="user",
+    supabase: Client = Depends(get_supabase)
 ):
     """
     Endpoint para registrar nuevos usuarios.
@@ -308,13 +513,17 @@ def register_user(
         "password": hashed_password,
         "role": role
     }).execute()
+    replica.usuarios.aplicar(response.data)
 
     print(response)  # Imprimir respuesta para depuración
     return {"message": "¡USUARIO CREADO EXITOSAMENTE!"}
 
 
 @app.post("/token")
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
+def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    supabase: Client = Depends(get_supabase)
+):
     response = supabase.table("users").select("*").eq("nick", form_data.username).execute()
     user = response.data[0] if response.data else None
 
@@ -327,15 +536,107 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
 
 
 
+@app.post("/f1/jobs/session", tags=["F1"], status_code=202)
+async def create_f1_session_job(
+    session_request: SessionRequest,
+    request: Request,
+    current_user: Optional[dict] = Depends(get_optional_user)
+):
+    """
+    Endpoint para encolar la carga de una sesión de Fórmula 1 en segundo plano.
+
+    Devuelve el id del trabajo, con el que se consulta su estado en `/f1/jobs/{job_id}`
+    y sus datos en `/f1/jobs/{job_id}/result`. Si ya existe un trabajo en curso o
+    completado para la misma sesión y pilotos, se devuelve ese trabajo. La carga se
+    hace con turno del limitador de admisión del usuario que encola el trabajo.
+    """
+    trabajo = await gestor_trabajos.enviar(
+        session_request.year,
+        session_request.circuit,
+        session_request.session,
+        session_request.drivers,
+        clave_usuario(request, current_user),
+    )
+    return {"message": "Trabajo encolado", **trabajo.to_dict()}
+
+
+@app.post("/f1/session/batch", tags=["F1"])
+async def get_f1_sessions_batch(
+    specs: List[SessionRequest],
+    request: Request,
+    current_user: Optional[dict] = Depends(get_optional_user)
+):
+    """
+    Endpoint para obtener las vueltas de varias combinaciones de sesión y pilotos.
+
+    Las peticiones se agrupan por sesión para cargar cada una una sola vez (de una en una
+    y con turno del limitador de admisión), y los filtros de pilotos se ejecutan en paralelo.
+    Los resultados se envían en NDJSON a medida que están listos, una línea por petición
+    con su posición (`index`), la petición (`spec`) y sus datos o su error.
+    """
+    # Importación diferida: fastf1 y pandas solo se cargan al usar los endpoints F1
+    from app.fastf1 import sesion
+
+    if len(specs) > F1_BATCH_MAX_SPECS:
+        raise HTTPException(status_code=400, detail=f"El lote admite como máximo {F1_BATCH_MAX_SPECS} peticiones")
+
+    usuario = clave_usuario(request, current_user)
+    loop = asyncio.get_running_loop()
+    cargas = {}  # Clave de sesión -> tarea que la carga
+    turno_lote = asyncio.Semaphore(1)  # Una carga en frío a la vez por lote
+
+    async def cargar(f1_session):
+        if f1_session.en_cache() or f1_session.en_curso():
+            await f1_session.load_sesion()
+        else:
+            async with turno_lote, limitador_sesiones.turno(usuario):
+                await f1_session.load_sesion()
+        return f1_session.indice
+
+    def serializar(index, spec, indice):
+        registros = indice.registros(spec.drivers)
+        if not registros:
+            return {
+                "index": index, "spec": spec.dict(), "status": 404,
+                "error": f"No se encontraron datos para los pilotos especificados ({', '.join(spec.drivers)}).",
+            }
+        return jsonable_encoder({"index": index, "spec": spec.dict(), "status": 200, "data": registros})
+
+    async def procesar(index, spec):
+        f1_session = sesion(spec.year, spec.circuit, spec.session, spec.drivers)
+        if f1_session.key not in cargas:
+            cargas[f1_session.key] = asyncio.ensure_future(cargar(f1_session))
+        try:
+            indice = await cargas[f1_session.key]
+            return await loop.run_in_executor(None, serializar, index, spec, indice)
+        except HTTPException as e:
+            return {"index": index, "spec": spec.dict(), "status": e.status_code, "error": e.detail}
+        except Exception as e:
+            return {
+                "index": index, "spec": spec.dict(), "status": 500,
+                "error": f"Error al cargar los datos de la sesión: {str(e)}",
+            }
+
+    async def generar():
+        for resultado in asyncio.as_completed([procesar(index, spec) for index, spec in enumerate(specs)]):
+            yield json.dumps(await resultado, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generar(), media_type="application/x-ndjson")
+
+
 @app.post("/f1/calendar/new", tags=["F1"])
-def add_new_race(race_data: RaceData, current_user: dict = Depends(verify_admin_role)):
+def add_new_race(
+    race_data: RaceData, current_user: dict = Depends(verify_admin_role),
+    supabase_datos: Optional[Client] = Depends(get_supabase_datos)
+):
     """
     Endpoint para añadir una nueva carrera al calendario de F1.
     """
     try:
         race_data_dict = race_data.dict()
-        supabase_circuit = SupabaseDataCircuit(tabla="datos_circuitos")
+        supabase_circuit = SupabaseDataCircuit(tabla="datos_circuitos", client=supabase_datos)
         response = supabase_circuit.create_race(race_data_dict)
+        replica.circuitos.aplicar(response.data)
         return {"message": "Carrera añadida exitosamente", "data": response}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -349,7 +650,10 @@ def add_new_race(race_data: RaceData, current_user: dict = Depends(verify_admin_
 
 
 @app.delete("/users/{nick}", tags=["Usuarios"])
-async def delete_user(nick: str, current_user: str = Depends(get_current_user)):
+async def delete_user(
+    nick: str, current_user: str = Depends(get_current_user),
+    supabase: Client = Depends(get_supabase)
+):
     """
     Elimina un usuario especificado por su nick.
 
@@ -364,20 +668,25 @@ async def delete_user(nick: str, current_user: str = Depends(get_current_user)):
         dict: Mensaje de confirmación y datos de la operación.
     """
     try:
-        supabase_client = SupabaseAPI(tabla="users", select="*")
+        supabase_client = SupabaseAPI(tabla="users", select="*", client=supabase)
         response = supabase_client.delete_user(nick)
+        replica.usuarios.eliminar(response.data)
         return {"message": f"Usuario {nick} eliminado exitosamente", "data": response.data}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     
 @app.delete("/f1/calendar/delete/{race_name}", tags=["F1"])
-def delete_race(race_name: str, current_user: dict = Depends(verify_admin_role)):
+def delete_race(
+    race_name: str, current_user: dict = Depends(verify_admin_role),
+    supabase_datos: Optional[Client] = Depends(get_supabase_datos)
+):
     """
     Endpoint para eliminar una carrera del calendario de F1.
     """
     try:
-        supabase_circuit = SupabaseDataCircuit(tabla="datos_circuitos")
+        supabase_circuit = SupabaseDataCircuit(tabla="datos_circuitos", client=supabase_datos)
         response = supabase_circuit.delete_race(race_name)
+        replica.circuitos.eliminar(response)
         return {"message": "Carrera eliminada exitosamente", "data": response}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class Description(BaseModel):
     DriverNumber: str
@@ -42,3 +42,9 @@ class RaceData(BaseModel):
     medio: str
     blando: str
     primer_gp: int
+
+class SessionRequest(BaseModel):
+    year: int
+    circuit: str
+    session: str
+    drivers: List[str]
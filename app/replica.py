@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Configuración de la réplica local
+REPLICA_ENABLED = os.getenv("READ_REPLICA", "0").lower() in ("1", "true", "yes")
+SYNC_INTERVAL = float(os.getenv("REPLICA_SYNC_SECONDS", "60"))  # Segundos entre sincronizaciones
+MAX_STALENESS = float(os.getenv("REPLICA_MAX_STALENESS_SECONDS", "900"))  # Antigüedad máxima servida
+
+
+def _hash(fila: Dict) -> str:
+    """Huella del contenido de una fila para detectar cambios."""
+    return hashlib.sha1(json.dumps(fila, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class TablaReplica():
+    """
+    Copia local de una tabla de Supabase, indexada por su clave natural.
+
+    SQLAlchemy y la tabla local solo se cargan al usar la réplica, de modo que con
+    `READ_REPLICA` desactivado importar este módulo no tiene coste.
+    """
+
+    def __init__(self, tabla: str, nombre_local: str, clave: str,
+                 indexadas: tuple = (), excluidas: tuple = ()):
+        """
+        Args:
+            tabla (str): Nombre de la tabla en Supabase.
+            nombre_local (str): Nombre de la tabla local donde se guarda la copia.
+            clave (str): Columna que identifica cada fila de forma única.
+            indexadas (tuple): Columnas adicionales por las que se filtra con `leer`.
+            excluidas (tuple): Columnas de Supabase que no se copian a la réplica.
+        """
+        self.tabla = tabla
+        self.nombre_local = nombre_local
+        self.clave = clave
+        self.indexadas = indexadas
+        self.excluidas = excluidas
+        self.sincronizada: Optional[float] = None  # Instante de la última sincronización completa
+        self.version = 0  # Se incrementa con cada cambio aplicado a la réplica
+        self._replica = None
+        self._creada = False
+
+    @property
+    def replica(self):
+        """Tabla local (`sqlalchemy.Table`) con la copia, definida en el primer uso."""
+        if self._replica is None:
+            from sqlalchemy import Table, Column, String, Text
+            from app.database import metadata
+
+            self._replica = Table(
+                self.nombre_local, metadata,
+                Column(self.clave, String, primary_key=True),
+                *[Column(columna, String, index=True) for columna in self.indexadas],
+                Column("data", Text, nullable=False),  # Fila completa en JSON
+                Column("hash", String, nullable=False),
+            )
+        return self._replica
+
+    def _engine(self):
+        from app.database import metadata, get_engine
+
+        engine = get_engine()
+        if not self._creada:
+            metadata.create_all(engine, tables=[self.replica])
+            self._creada = True
+        return engine
+
+    def _sin_excluidas(self, dato: Dict) -> Dict:
+        return {columna: valor for columna, valor in dato.items() if columna not in self.excluidas}
+
+    def _fila(self, dato: Dict) -> Dict:
+        """Construye la fila local a partir de una fila de Supabase."""
+        dato = self._sin_excluidas(dato)
+        fila = {
+            columna.name: dato.get(columna.name)
+            for columna in self.replica.columns
+            if columna.name not in ("data", "hash")
+        }
+        fila["data"] = json.dumps(dato, ensure_ascii=False, default=str)
+        fila["hash"] = _hash(dato)
+        return fila
+
+    def _upsert(self, conn, filas: List[Dict]):
+        from app.database import upsert
+
+        upsert(conn, self.replica, filas, self.clave)
+
+    def disponible(self) -> bool:
+        """Indica si la réplica está activada y dentro de la antigüedad máxima permitida."""
+        return (
+            REPLICA_ENABLED
+            and self.sincronizada is not None
+            and time.time() - self.sincronizada <= MAX_STALENESS
+        )
+
+    def sincronizar(self, client) -> int:
+        """
+        Sincroniza la réplica con Supabase aplicando solo las diferencias.
+
+        Se comparan las huellas de las filas remotas con las locales y se insertan,
+        actualizan o eliminan únicamente las filas que han cambiado.
+
+        Args:
+            client (Client): Cliente de Supabase con acceso a la tabla.
+
+        Returns:
+            int: Número de filas modificadas en la réplica.
+        """
+        from sqlalchemy import select, delete
+
+        remotas = {
+            fila[self.clave]: self._sin_excluidas(fila)
+            for fila in client.table(self.tabla).select("*").execute().data
+        }
+
+        with self._engine().begin() as conn:
+            locales = dict(conn.execute(select(self.replica.c[self.clave], self.replica.c.hash)).all())
+
+            cambiadas = [
+                self._fila(fila) for clave, fila in remotas.items()
+                if locales.get(clave) != _hash(fila)
+            ]
+            borradas = [clave for clave in locales if clave not in remotas]
+
+            if cambiadas:
+                self._upsert(conn, cambiadas)
+            if borradas:
+                conn.execute(delete(self.replica).where(self.replica.c[self.clave].in_(borradas)))
+
+        if cambiadas or borradas:
+            self.version += 1
+        self.sincronizada = time.time()
+        return len(cambiadas) + len(borradas)
+
+    def aplicar(self, datos: List[Dict], reemplaza: Optional[Dict] = None):
+        """
+        Aplica a la réplica las filas devueltas por una escritura de la propia API.
+
+        Args:
+            datos (list): Filas escritas en Supabase.
+            reemplaza (dict, optional): Filtro de igualdad que identifica las filas
+                actualizadas (p. ej. `{"nick": nick}`). Las filas locales que cumplen el
+                filtro y cuya clave ya no está en `datos` se eliminan, de modo que un
+                cambio de clave no deja la fila anterior en la réplica.
+        """
+        from sqlalchemy import delete
+
+        if not REPLICA_ENABLED or not datos:
+            return
+        try:
+            filas = [self._fila(dato) for dato in datos]
+            with self._engine().begin() as conn:
+                if reemplaza:
+                    anteriores = delete(self.replica).where(
+                        self.replica.c[self.clave].not_in([fila[self.clave] for fila in filas])
+                    )
+                    for columna, valor in reemplaza.items():
+                        anteriores = anteriores.where(self.replica.c[columna] == valor)
+                    conn.execute(anteriores)
+                self._upsert(conn, filas)
+            self.version += 1
+        except Exception as e:
+            print(f"Error actualizando la réplica de {self.tabla}: {str(e)}")
+
+    def eliminar(self, datos: List[Dict]):
+        """Elimina de la réplica las filas borradas por una escritura de la propia API."""
+        from sqlalchemy import delete
+
+        if not REPLICA_ENABLED or not datos:
+            return
+        try:
+            claves = [dato[self.clave] for dato in datos]
+            with self._engine().begin() as conn:
+                conn.execute(delete(self.replica).where(self.replica.c[self.clave].in_(claves)))
+            self.version += 1
+        except Exception as e:
+            print(f"Error actualizando la réplica de {self.tabla}: {str(e)}")
+
+    def leer(self, **filtros) -> List[Dict]:
+        """
+        Lee filas de la réplica filtrando por igualdad en columnas indexadas.
+
+        Returns:
+            list: Filas con la misma estructura que devuelve Supabase.
+        """
+        from sqlalchemy import select
+
+        query = select(self.replica.c.data)
+        for columna, valor in filtros.items():
+            query = query.where(self.replica.c[columna] == valor)
+        with self._engine().connect() as conn:
+            return [json.loads(data) for data in conn.execute(query).scalars()]
+
+
+# Los hashes de contraseña no se copian: ningún endpoint servido por la réplica los usa
+usuarios = TablaReplica("users", "replica_users", "email", indexadas=("nick",), excluidas=("password",))
+circuitos = TablaReplica("datos_circuitos", "replica_datos_circuitos", "circuito")
+
+
+async def sincronizar_periodicamente(supabase, supabase_datos):
+    """
+    Sincroniza las réplicas cada `SYNC_INTERVAL` segundos hasta que se cancele la tarea.
+
+    Las consultas a Supabase se ejecutan en un hilo para no bloquear el bucle de eventos.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        for replica, client in ((usuarios, supabase), (circuitos, supabase_datos)):
+            if client is None:
+                continue
+            try:
+                cambios = await loop.run_in_executor(None, replica.sincronizar, client)
+                if cambios:
+                    print(f"Réplica de {replica.tabla} sincronizada: {cambios} cambios")
+            except Exception as e:
+                print(f"Error sincronizando la réplica de {replica.tabla}: {str(e)}")
+        await asyncio.sleep(SYNC_INTERVAL)
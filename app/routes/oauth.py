@@ -18,6 +18,7 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
 # Configuración de OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Métodos auxiliares
@@ -92,6 +93,23 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise HTTPException(status_code=401, detail="Token inválido o expirado")
 
+# Dependencia para endpoints que admiten peticiones sin autenticar
+def get_optional_user(token: Optional[str] = Depends(oauth2_scheme_optional)):
+    """Obtiene el usuario actual si se proporciona un token.
+
+    Args:
+        token (str, optional): Token de acceso JWT.
+
+    Raises:
+        HTTPException: Si el token proporcionado es inválido o ha expirado.
+
+    Returns:
+        dict: Payload del token, o None si la petición no incluye token.
+    """
+    if token is None:
+        return None
+    return get_current_user(token)
+
 # Dependencia para verificar el rol de administrador
 def verify_admin_role(current_user: dict = Depends(get_current_user)):
     if current_user.get("role") == "admin":
@@ -0,0 +1,282 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Directorio compartido entre workers; si no se define la caché compartida está desactivada
+SHARED_CACHE_DIR = os.getenv("F1_SHARED_CACHE_DIR")
+SHARED_CACHE_MAX_BYTES = int(os.getenv("F1_SHARED_CACHE_MAX_BYTES", str(1024 ** 3)))
+
+# Versión del formato en disco; al cambiarla se ignoran las entradas anteriores
+FORMATO = 2
+
+# Antigüedad a partir de la cual se borran directorios temporales abandonados
+_TEMPORALES_TTL = 3600
+
+
+class CacheCompartida():
+    """
+    Caché de vueltas de sesiones compartida entre procesos mediante archivos mapeados en memoria.
+
+    Cada sesión se guarda como un directorio con un archivo `.npy` por columna y un
+    `manifest.json` con la descripción de las columnas. Un proceso carga la sesión y la
+    publica de forma atómica; el resto la mapea en memoria sin copiarla, de modo que
+    todos los workers comparten las mismas páginas de la caché del sistema operativo.
+
+    - Un bloqueo por sesión evita que varios procesos carguen la misma sesión a la vez.
+    - La publicación se escribe en un directorio temporal y se renombra al final.
+    - Cuando el tamaño total supera el máximo se eliminan las sesiones usadas hace más tiempo.
+    """
+
+    def __init__(self, directorio: str, max_bytes: int):
+        """
+        Args:
+            directorio (str): Directorio compartido por los workers.
+            max_bytes (int): Tamaño máximo de la caché en disco.
+        """
+        self.directorio = os.path.join(directorio, f"v{FORMATO}")
+        self.max_bytes = max_bytes
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def _ruta(self, clave: tuple) -> str:
+        nombre = hashlib.sha1(repr(clave).encode("utf-8")).hexdigest()
+        return os.path.join(self.directorio, nombre)
+
+    @contextmanager
+    def _bloqueo(self, ruta: str):
+        """
+        Bloqueo exclusivo entre procesos sobre el archivo `ruta`.
+
+        La expulsión borra los archivos de bloqueo de las sesiones eliminadas; si el
+        archivo bloqueado ya no es el de `ruta` se vuelve a abrir y bloquear.
+        """
+        while True:
+            archivo = open(ruta, "a")
+            try:
+                fcntl.flock(archivo, fcntl.LOCK_EX)
+                if self._vigente(archivo, ruta):
+                    break
+            except BaseException:
+                archivo.close()
+                raise
+            archivo.close()
+
+        with archivo:
+            try:
+                yield
+            finally:
+                fcntl.flock(archivo, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _vigente(archivo, ruta: str) -> bool:
+        """Indica si el archivo abierto sigue siendo el que está en `ruta`."""
+        try:
+            return os.path.samestat(os.fstat(archivo.fileno()), os.stat(ruta))
+        except FileNotFoundError:
+            return False
+
+    def _eliminar_bloqueo(self, ruta: str):
+        """Borra el archivo de bloqueo `ruta` si ningún proceso lo tiene bloqueado."""
+        try:
+            archivo = open(ruta, "r")
+        except FileNotFoundError:
+            return
+        with archivo:
+            try:
+                fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Un proceso está cargando la sesión; se borrará en otra expulsión
+                return
+            try:
+                if self._vigente(archivo, ruta):
+                    os.unlink(ruta)
+            finally:
+                fcntl.flock(archivo, fcntl.LOCK_UN)
+
+    def obtener(self, clave: tuple, cargar: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Devuelve las vueltas de la sesión `clave` mapeadas desde la caché compartida.
+
+        Si la sesión no está publicada se carga con `cargar` mientras se mantiene el
+        bloqueo de la sesión, se publica y se devuelve la versión mapeada.
+
+        Args:
+            clave (tuple): Clave de la sesión.
+            cargar (Callable): Función que descarga las vueltas de la sesión.
+
+        Returns:
+            pd.DataFrame: Vueltas de la sesión.
+        """
+        ruta = self._ruta(clave)
+        vueltas = self._abrir(ruta)
+        if vueltas is not None:
+            return vueltas
+
+        with self._bloqueo(ruta + ".lock"):
+            # Otro proceso puede haberla publicado mientras se esperaba el bloqueo
+            vueltas = self._abrir(ruta)
+            if vueltas is not None:
+                return vueltas
+
+            vueltas = cargar()
+            try:
+                self._publicar(ruta, clave, vueltas)
+            except (ValueError, OSError) as e:
+                print(f"Sesión {clave} no publicada en la caché compartida: {str(e)}")
+                return vueltas
+
+        self._expulsar(conservar=ruta)
+        mapeadas = self._abrir(ruta)
+        return mapeadas if mapeadas is not None else vueltas
+
+    def _abrir(self, ruta: str) -> Optional[pd.DataFrame]:
+        """Mapea en memoria una sesión publicada, o devuelve None si no está disponible."""
+        manifiesto = os.path.join(ruta, "manifest.json")
+        try:
+            with open(manifiesto, encoding="utf-8") as archivo:
+                descripcion = json.load(archivo)
+            if descripcion.get("formato") != FORMATO:
+                return None
+
+            columnas = {
+                columna["nombre"]: self._leer_columna(ruta, columna)
+                for columna in descripcion["columnas"]
+            }
+            if columnas:
+                # Sin copia: cada columna apunta al archivo mapeado
+                vueltas = pd.DataFrame(columnas, copy=False)
+            else:
+                vueltas = pd.DataFrame(index=pd.RangeIndex(descripcion["filas"]))
+
+            # Marca de último uso para la expulsión
+            os.utime(manifiesto)
+            return vueltas
+        except (FileNotFoundError, NotADirectoryError):
+            # No publicada o eliminada mientras se abría
+            return None
+
+    @staticmethod
+    def _leer_columna(ruta: str, columna: dict):
+        def cargar(sufijo=""):
+            return np.load(os.path.join(ruta, f"{columna['archivo']}{sufijo}.npy"), mmap_mode="r")
+
+        if columna["tipo"] == "categoria":
+            return pd.Categorical.from_codes(cargar(), categories=columna["categorias"], ordered=columna["ordenada"])
+        if columna["tipo"] == "boolean":
+            return pd.arrays.BooleanArray(cargar(), cargar(".mask"))
+        return cargar()
+
+    @staticmethod
+    def _escribir_columna(ruta: str, indice: int, serie: pd.Series) -> dict:
+        """Guarda una columna en `.npy` y devuelve su descripción para el manifiesto."""
+        columna = {"nombre": str(serie.name), "archivo": str(indice)}
+        base = os.path.join(ruta, str(indice))
+
+        if serie.dtype == object:
+            # Las columnas de texto se guardan como categóricas
+            serie = serie.astype("category")
+
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            categorias = serie.cat.categories.tolist()
+            if not all(isinstance(c, (str, int, float, bool)) for c in categorias):
+                raise ValueError(f"categorías no serializables en la columna {serie.name}")
+            np.save(base, serie.cat.codes.to_numpy())
+            columna.update(tipo="categoria", categorias=categorias, ordenada=bool(serie.cat.ordered))
+        elif isinstance(serie.dtype, pd.BooleanDtype):
+            np.save(base, serie.array._data)
+            np.save(base + ".mask", serie.array._mask)
+            columna.update(tipo="boolean")
+        elif isinstance(serie.dtype, np.dtype) and serie.dtype.kind in "biufmM":
+            np.save(base, np.ascontiguousarray(serie.to_numpy()))
+            columna.update(tipo="numpy")
+        else:
+            raise ValueError(f"tipo {serie.dtype} no soportado en la columna {serie.name}")
+        return columna
+
+    def _publicar(self, ruta: str, clave: tuple, vueltas: pd.DataFrame):
+        """Escribe la sesión en un directorio temporal y lo renombra de forma atómica."""
+        temporal = os.path.join(self.directorio, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(temporal)
+        try:
+            columnas = [
+                self._escribir_columna(temporal, indice, vueltas[nombre])
+                for indice, nombre in enumerate(vueltas.columns)
+            ]
+            with open(os.path.join(temporal, "manifest.json"), "w", encoding="utf-8") as archivo:
+                json.dump({
+                    "formato": FORMATO,
+                    "clave": list(clave),
+                    "filas": len(vueltas),
+                    "publicado": time.time(),
+                    "columnas": columnas,
+                }, archivo, ensure_ascii=False)
+        except Exception:
+            shutil.rmtree(temporal, ignore_errors=True)
+            raise
+
+        try:
+            os.rename(temporal, ruta)
+        except OSError:
+            # Ya publicada por otro proceso
+            shutil.rmtree(temporal, ignore_errors=True)
+
+    def _expulsar(self, conservar: Optional[str] = None):
+        """
+        Elimina las sesiones usadas hace más tiempo hasta quedar por debajo del tamaño
+        máximo, junto con los archivos de bloqueo de las sesiones que ya no existen.
+        """
+        with self._bloqueo(os.path.join(self.directorio, ".expulsion.lock")):
+            ahora = time.time()
+            entradas = []
+            bloqueos = []
+            total = 0
+            for nombre in os.listdir(self.directorio):
+                ruta = os.path.join(self.directorio, nombre)
+                if not os.path.isdir(ruta):
+                    if nombre.endswith(".lock") and not nombre.startswith("."):
+                        bloqueos.append(ruta)
+                    continue
+                if nombre.startswith("."):
+                    # Temporales de publicaciones o borrados interrumpidos
+                    if ahora - os.path.getmtime(ruta) > _TEMPORALES_TTL:
+                        shutil.rmtree(ruta, ignore_errors=True)
+                    continue
+                try:
+                    tamano = sum(entrada.stat().st_size for entrada in os.scandir(ruta))
+                    uso = os.path.getmtime(os.path.join(ruta, "manifest.json"))
+                except FileNotFoundError:
+                    continue
+                entradas.append((uso, ruta, tamano))
+                total += tamano
+
+            for uso, ruta, tamano in sorted(entradas):
+                if total <= self.max_bytes:
+                    break
+                if ruta == conservar:
+                    continue
+                # Renombrar primero para que nadie abra una sesión a medio borrar;
+                # los procesos que ya la tienen mapeada la siguen leyendo sin problema
+                borrar = os.path.join(self.directorio, f".borrar-{uuid.uuid4().hex}")
+                os.rename(ruta, borrar)
+                shutil.rmtree(borrar, ignore_errors=True)
+                total -= tamano
+
+            for bloqueo in bloqueos:
+                if not os.path.isdir(bloqueo[:-len(".lock")]):
+                    self._eliminar_bloqueo(bloqueo)
+
+
+# Caché compartida del proceso, o None si no se ha configurado `F1_SHARED_CACHE_DIR`
+cache_compartida = CacheCompartida(SHARED_CACHE_DIR, SHARED_CACHE_MAX_BYTES) if SHARED_CACHE_DIR else None
@@ -4,7 +4,7 @@ from dotenv import load_dotenv
 
 
 class SupabaseAPI():
-    def __init__(self, tabla, select, data=None):
+    def __init__(self, tabla, select, data=None, client: Client = None):
         """
         Inicializa la instancia de SupabaseAPI.
 
@@ -12,10 +12,20 @@ class SupabaseAPI():
             tabla (str): Nombre de la tabla en Supabase.
             select (str): Campos a seleccionar en las consultas.
             data (dict, optional): Datos a insertar o actualizar. Por defecto es None.
+            client (Client, optional): Cliente de Supabase ya creado. Si es None se crea uno nuevo.
 
         Nota:
             Si no se reciben datos para una operación de inserción o actualización, 'data' debe estar en None.
         """
+        self.tabla = tabla  # Nombre de la tabla a interactuar
+        self.select = select  # Campos a seleccionar en las consultas
+        self.data = data  # Datos para operaciones de inserción o actualización
+
+        # Reutilizar el cliente compartido si se proporciona
+        if client is not None:
+            self.supabase: Client = client
+            return
+
         # Cargar las variables de entorno desde el archivo .env
         load_dotenv()
 
@@ -33,10 +43,6 @@ class SupabaseAPI():
         # Crear el cliente de Supabase utilizando la URL y la clave
         self.supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-        self.tabla = tabla  # Nombre de la tabla a interactuar
-        self.select = select  # Campos a seleccionar en las consultas
-        self.data = data  # Datos para operaciones de inserción o actualización
-
     def fetch_data(self):
         """
         Obtiene datos de la tabla especificada.
@@ -4,7 +4,16 @@ from dotenv import load_dotenv
 from typing import Dict
 
 class SupabaseDataCircuit():
-    def __init__(self, tabla, select = '*', circuito = None):
+    def __init__(self, tabla, select = '*', circuito = None, client: Client = None):
+
+        self.tabla = tabla
+        self.select = select
+        self.circuito = circuito
+
+        # Reutilizar el cliente compartido si se proporciona
+        if client is not None:
+            self.supabase: Client = client
+            return
 
         #Varibales entorno
         load_dotenv()
@@ -25,10 +34,6 @@ class SupabaseDataCircuit():
             SUPABASE_KEY
         )
 
-        self.tabla = tabla
-        self.select = select
-        self.circuito = circuito
-
     def fetch_data(self):
         return self.supabase.table(self.tabla).select(self.select).execute()
 
@@ -41,6 +46,15 @@ class SupabaseDataCircuit():
             eq("circuito", circuit). \
             execute()
         return response
+
+    def fetch_data_query(self, consulta):
+        """
+        Obtiene los circuitos que cumplen una consulta, filtrando y ordenando en Supabase.
+        Args:
+            consulta (ConsultaCircuitos): Filtros, orden y límite a aplicar.
+        """
+        query = self.supabase.table(self.tabla).select(self.select)
+        return consulta.aplicar(query).execute()
     
     def delete_race(self, race_name: str):
         """
@@ -1,23 +1,138 @@
 import json
-from app.fastf1 import sesion
-
-
-def read_data():
-    try:
-        with open("app/data/data_filtered_pilots.json", "r", encoding="utf-8") as file:
-            data = json.load(file)
-            for index, item in enumerate(data):
-                if 'id' not in item:
-                    item['id'] = index
-                if 'name' not in item:
-                    item['name'] = f"Item {index}"
-            return data
-    except FileNotFoundError:
-        return []
-    
-def write_data(data):
-    with open("app/data/data_filtered_pilots.json", "w", encoding="utf-8") as file:
-        json.dump(data, file, indent=4)
-
-
-# f1
+from typing import Dict, List, Optional
+
+from sqlalchemy import Table, Column, Integer, String, Text, Index, select, delete
+
+from app.database import metadata, get_engine, upsert
+
+# Tamaño de los lotes de escritura
+BATCH_SIZE = 500
+
+# Vueltas filtradas por piloto con la estructura de `Item`
+items_pilotos = Table(
+    "items_pilotos", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String, nullable=False),  # Código del piloto
+    Column("team", String),
+    Column("description", Text, nullable=False),  # `Description` serializada en JSON
+    Index("ix_items_pilotos_name_id", "name", "id"),
+    Index("ix_items_pilotos_team_id", "team", "id"),
+)
+
+_tabla_creada = False
+
+
+def _conexion():
+    """Devuelve el motor local asegurando que la tabla `items_pilotos` existe."""
+    global _tabla_creada
+    engine = get_engine()
+    if not _tabla_creada:
+        metadata.create_all(engine, tables=[items_pilotos])
+        _tabla_creada = True
+    return engine
+
+
+def _to_row(index: int, item: Dict) -> Dict:
+    """Convierte un `Item` en una fila, completando `id` (con su posición) y `name` si faltan."""
+    description = item.get("description") or {}
+    return {
+        "id": int(item.get("id", index)),
+        "name": item.get("name", f"Item {index}"),
+        "team": description.get("Team"),
+        "description": json.dumps(description, ensure_ascii=False, default=str),
+    }
+
+
+def _to_item(row) -> Dict:
+    """Convierte una fila de `items_pilotos` en un diccionario con la estructura de `Item`."""
+    return {
+        "id": row.id,
+        "name": row.name,
+        "description": json.loads(row.description),
+    }
+
+
+def _batches(rows: List[Dict]):
+    for start in range(0, len(rows), BATCH_SIZE):
+        yield rows[start:start + BATCH_SIZE]
+
+
+def read_data(
+    driver: Optional[str] = None,
+    team: Optional[str] = None,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Lee ítems del almacén local usando los índices por id, piloto y equipo.
+
+    La paginación es por cursor: se devuelven los ítems con `id` mayor que `after_id`
+    ordenados por `id`, de modo que cada página cuesta O(log n) independientemente de su posición.
+
+    Args:
+        driver (str, optional): Código del piloto a filtrar.
+        team (str, optional): Equipo a filtrar.
+        after_id (int, optional): Último `id` de la página anterior.
+        limit (int, optional): Número máximo de ítems a devolver.
+
+    Returns:
+        list: Ítems con la estructura de `Item`.
+    """
+    query = select(items_pilotos).order_by(items_pilotos.c.id)
+    if driver is not None:
+        query = query.where(items_pilotos.c.name == driver)
+    if team is not None:
+        query = query.where(items_pilotos.c.team == team)
+    if after_id is not None:
+        query = query.where(items_pilotos.c.id > after_id)
+    if limit is not None:
+        query = query.limit(limit)
+
+    with _conexion().connect() as conn:
+        return [_to_item(row) for row in conn.execute(query)]
+
+
+def read_item(item_id: int) -> Optional[Dict]:
+    """
+    Obtiene un ítem por su `id`.
+
+    Returns:
+        dict: Ítem con la estructura de `Item`, o None si no existe.
+    """
+    with _conexion().connect() as conn:
+        row = conn.execute(
+            select(items_pilotos).where(items_pilotos.c.id == item_id)
+        ).first()
+    return _to_item(row) if row is not None else None
+
+
+def write_data(data: List[Dict]):
+    """
+    Reemplaza todos los ítems del almacén local de forma atómica.
+
+    El borrado y las inserciones por lotes se ejecutan en una única transacción,
+    por lo que los lectores ven el contenido anterior o el nuevo, nunca uno parcial.
+    """
+    rows = [_to_row(index, item) for index, item in enumerate(data)]
+    with _conexion().begin() as conn:
+        conn.execute(delete(items_pilotos))
+        for batch in _batches(rows):
+            conn.execute(items_pilotos.insert(), batch)
+
+
+def upsert_data(data: List[Dict]):
+    """
+    Inserta o actualiza ítems por `id` en lotes dentro de una única transacción.
+
+    Raises:
+        ValueError: Si algún ítem no tiene `id`; sin él no se sabe qué ítem actualizar
+            y el id por posición sobrescribiría ítems existentes.
+    """
+    sin_id = [index for index, item in enumerate(data) if item.get("id") is None]
+    if sin_id:
+        raise ValueError(f"Los ítems de las posiciones {sin_id} no tienen `id`")
+
+    rows = [_to_row(index, item) for index, item in enumerate(data)]
+    with _conexion().begin() as conn:
+        for batch in _batches(rows):
+            upsert(conn, items_pilotos, batch, "id")
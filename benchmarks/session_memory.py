@@ -0,0 +1,152 @@
+"""
+Benchmark de memoria de las vueltas de una sesión en caché.
+
+Compara la memoria (incluyendo los objetos de Python) del DataFrame de vueltas tal
+como lo devuelve fastf1 y después de `compactar_vueltas`, comprueba que la
+compactación no pierde información y estima cuántas sesiones caben por GiB.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/session_memory.py --year 2023 --circuit Bahrain --session R
+    python benchmarks/session_memory.py --sintetico
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app.fastf1 import compactar_vueltas, vueltas_a_registros  # noqa: E402
+
+GIB = 1024 ** 3
+
+# Parrilla para el modo sintético: (piloto, número, equipo)
+PARRILLA = [
+    ("VER", "1", "Red Bull Racing"), ("PER", "11", "Red Bull Racing"),
+    ("HAM", "44", "Mercedes"), ("RUS", "63", "Mercedes"),
+    ("LEC", "16", "Ferrari"), ("SAI", "55", "Ferrari"),
+    ("NOR", "4", "McLaren"), ("PIA", "81", "McLaren"),
+    ("ALO", "14", "Aston Martin"), ("STR", "18", "Aston Martin"),
+    ("GAS", "10", "Alpine"), ("OCO", "31", "Alpine"),
+    ("ALB", "23", "Williams"), ("SAR", "2", "Williams"),
+    ("TSU", "22", "AlphaTauri"), ("DEV", "21", "AlphaTauri"),
+    ("BOT", "77", "Alfa Romeo"), ("ZHO", "24", "Alfa Romeo"),
+    ("HUL", "27", "Haas F1 Team"), ("MAG", "20", "Haas F1 Team"),
+]
+
+
+def vueltas_sinteticas(n_vueltas=57, semilla=0):
+    """Genera vueltas con las mismas columnas y tipos que `Session.laps` de fastf1."""
+    rng = np.random.default_rng(semilla)
+    filas = len(PARRILLA) * n_vueltas
+    pilotos = np.repeat([p[0] for p in PARRILLA], n_vueltas)
+    numeros = np.repeat([p[1] for p in PARRILLA], n_vueltas)
+    equipos = np.repeat([p[2] for p in PARRILLA], n_vueltas)
+    vuelta = np.tile(np.arange(1, n_vueltas + 1, dtype=np.float64), len(PARRILLA))
+    stint = np.minimum(vuelta // 20 + 1, 3)
+    compuesto = np.array(["SOFT", "HARD", "MEDIUM"])[(stint - 1).astype(int)]
+
+    def tiempos(media, desviacion):
+        ms = np.round(rng.normal(media, desviacion, filas) * 1000)
+        return pd.to_timedelta(ms, unit="ms")
+
+    lap_time = tiempos(95, 1.5)
+    time = pd.to_timedelta(np.cumsum(lap_time.total_seconds().to_numpy().reshape(len(PARRILLA), -1), axis=1).ravel(), unit="s")
+    pit = pd.Series(pd.NaT, index=range(filas), dtype="timedelta64[ns]")
+    cambio = np.isin(vuelta, [20, 40])
+    pit[cambio] = time[cambio]
+
+    return pd.DataFrame({
+        "Time": time,
+        "Driver": pilotos.astype(object),
+        "DriverNumber": numeros.astype(object),
+        "LapTime": lap_time,
+        "LapNumber": vuelta,
+        "Stint": stint,
+        "PitOutTime": pit.shift(1),
+        "PitInTime": pit,
+        "Sector1Time": tiempos(30, 0.5),
+        "Sector2Time": tiempos(40, 0.5),
+        "Sector3Time": tiempos(25, 0.5),
+        "Sector1SessionTime": time - tiempos(65, 0.5),
+        "Sector2SessionTime": time - tiempos(25, 0.5),
+        "Sector3SessionTime": time,
+        "SpeedI1": np.round(rng.normal(230, 5, filas)),
+        "SpeedI2": np.round(rng.normal(260, 5, filas)),
+        "SpeedFL": np.round(rng.normal(280, 5, filas)),
+        "SpeedST": np.round(rng.normal(310, 5, filas)),
+        "IsPersonalBest": rng.random(filas) < 0.1,
+        "Compound": compuesto.astype(object),
+        "TyreLife": vuelta - (stint - 1) * 20 + 1,
+        "FreshTyre": np.where(rng.random(filas) < 0.05, None, True).astype(object),
+        "Team": equipos.astype(object),
+        "LapStartTime": time - lap_time,
+        "LapStartDate": pd.Timestamp("2023-03-05 15:00") + (time - lap_time),
+        "TrackStatus": rng.choice(["1", "12", "2", "4"], filas).astype(object),
+        "Position": np.tile(np.arange(1, len(PARRILLA) + 1, dtype=np.float64), n_vueltas),
+        # fastf1 deja `Deleted` sin valor en las vueltas sin información de carrera
+        "Deleted": np.where(rng.random(filas) < 0.05, None, rng.random(filas) < 0.02).astype(object),
+        "DeletedReason": np.where(rng.random(filas) < 0.02, "TRACK LIMITS AT TURN 4", "").astype(object),
+        "FastF1Generated": np.zeros(filas, dtype=bool),
+        "IsAccurate": rng.random(filas) < 0.95,
+    })
+
+
+def vueltas_reales(year, circuit, session):
+    """Carga las vueltas de una sesión real con fastf1."""
+    import fastf1
+
+    carga = fastf1.get_session(year, circuit, session)
+    carga.load(telemetry=False, weather=False, messages=False)
+    return pd.DataFrame(carga.laps).reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--year", type=int, default=2023)
+    parser.add_argument("--circuit", default="Bahrain")
+    parser.add_argument("--session", default="R")
+    parser.add_argument("--sintetico", action="store_true", help="Usar vueltas sintéticas sin descargar datos")
+    parser.add_argument("--columnas", action="store_true", help="Mostrar la memoria por columna")
+    args = parser.parse_args()
+
+    if args.sintetico:
+        original = vueltas_sinteticas()
+    else:
+        original = vueltas_reales(args.year, args.circuit, args.session)
+
+    compactado = compactar_vueltas(original.copy())
+
+    # La compactación no debe cambiar ningún valor
+    restaurado = compactado.astype({c: original[c].dtype for c in original.columns})
+    # Los nulos de las columnas `boolean` vuelven como `pd.NA`; fastf1 usa None
+    objetos = [c for c in original.columns if original[c].dtype == object]
+    restaurado[objetos] = restaurado[objetos].where(restaurado[objetos].notna(), None)
+    pd.testing.assert_frame_equal(original, restaurado, check_dtype=False)
+
+    # La serialización de las vueltas compactadas debe coincidir con la de las originales
+    # limpiadas con `fillna(0)` y sin infinitos
+    limpias = original.fillna(0).replace([float('inf'), float('-inf')], 0)
+    assert jsonable_encoder(vueltas_a_registros(compactado)) == jsonable_encoder(limpias.to_dict(orient="records"))
+
+    antes = original.memory_usage(deep=True)
+    despues = compactado.memory_usage(deep=True)
+
+    if args.columnas:
+        print(f"{'Columna':<20} {'Antes':>12} {'Después':>12}  Tipo")
+        for columna in original.columns:
+            print(f"{columna:<20} {antes[columna]:>12,} {despues[columna]:>12,}  {original[columna].dtype} -> {compactado[columna].dtype}")
+        print()
+
+    print(f"Filas: {len(original):,}")
+    print(f"Memoria original:   {antes.sum() / 1024:10.1f} KiB  ({GIB // antes.sum():,} sesiones/GiB)")
+    print(f"Memoria compactada: {despues.sum() / 1024:10.1f} KiB  ({GIB // despues.sum():,} sesiones/GiB)")
+    print(f"Reducción: x{antes.sum() / despues.sum():.2f}")
+
+
+if __name__ == "__main__":
+    main()
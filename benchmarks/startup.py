@@ -0,0 +1,126 @@
+"""
+Benchmark de arranque de la API.
+
+Mide, cada uno en un intérprete nuevo:
+    - El tiempo de importación de cada módulo relevante.
+    - Qué módulos pesados arrastra `import app.main` (deberían ser ninguno).
+    - El tiempo hasta la primera respuesta de `/` lanzando uvicorn.
+
+Uso (desde la raíz del repositorio, con las variables de entorno del `.env`):
+    python benchmarks/startup.py
+    python benchmarks/startup.py --repeticiones 5 --puerto 8765
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from urllib.error import URLError
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos cuyo tiempo de importación se mide por separado
+MODULOS = [
+    "fastapi",
+    "supabase",
+    "sqlalchemy",
+    "pandas",
+    "fastf1",
+    "app.models",
+    "app.routes.oauth",
+    "app.supabase_data",
+    "app.supabase_races",
+    "app.replica",
+    "app.fastf1",
+    "app.main",
+]
+
+# Módulos que no deben cargarse al importar `app.main`
+MODULOS_PESADOS = ["fastf1", "pandas", "app.fastf1", "sqlalchemy"]
+
+
+def _python(codigo):
+    """Ejecuta `codigo` en un intérprete nuevo y devuelve su salida estándar."""
+    resultado = subprocess.run(
+        [sys.executable, "-c", codigo],
+        cwd=RAIZ, capture_output=True, text=True, check=True
+    )
+    return resultado.stdout.strip()
+
+
+def tiempo_importacion(modulo, repeticiones):
+    """Devuelve la mediana en segundos de importar `modulo` en frío."""
+    codigo = (
+        "import time\n"
+        "t = time.perf_counter()\n"
+        f"import {modulo}\n"
+        "print(time.perf_counter() - t)\n"
+    )
+    return statistics.median(float(_python(codigo)) for _ in range(repeticiones))
+
+
+def modulos_pesados_cargados():
+    """Devuelve los módulos pesados presentes en `sys.modules` tras importar `app.main`."""
+    codigo = (
+        "import sys\n"
+        "import app.main\n"
+        f"print(','.join(m for m in {MODULOS_PESADOS!r} if m in sys.modules))\n"
+    )
+    salida = _python(codigo)
+    return salida.split(",") if salida else []
+
+
+def tiempo_primera_peticion(puerto, timeout=60.0):
+    """Lanza uvicorn y mide el tiempo hasta que `/` responde con 200."""
+    url = f"http://127.0.0.1:{puerto}/"
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(puerto), "--log-level", "warning"],
+        cwd=RAIZ
+    )
+    try:
+        while time.perf_counter() - inicio < timeout:
+            if proceso.poll() is not None:
+                raise RuntimeError("uvicorn terminó antes de responder")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as respuesta:
+                    if respuesta.status == 200:
+                        return time.perf_counter() - inicio
+            except (URLError, ConnectionError):
+                time.sleep(0.01)
+        raise TimeoutError(f"Sin respuesta de {url} tras {timeout} s")
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=3, help="Repeticiones por medición")
+    parser.add_argument("--puerto", type=int, default=8765, help="Puerto para lanzar uvicorn")
+    args = parser.parse_args()
+
+    print("Tiempo de importación (mediana):")
+    for modulo in MODULOS:
+        try:
+            segundos = tiempo_importacion(modulo, args.repeticiones)
+            print(f"    {modulo:<22} {segundos * 1000:8.1f} ms")
+        except subprocess.CalledProcessError as e:
+            print(f"    {modulo:<22}    error: {e.stderr.strip().splitlines()[-1]}")
+
+    pesados = modulos_pesados_cargados()
+    if pesados:
+        print(f"\nREGRESIÓN: `import app.main` carga módulos pesados: {', '.join(pesados)}")
+    else:
+        print("\n`import app.main` no carga módulos pesados")
+
+    tiempos = [tiempo_primera_peticion(args.puerto) for _ in range(args.repeticiones)]
+    print(f"\nTiempo hasta la primera petición (mediana): {statistics.median(tiempos) * 1000:.1f} ms")
+
+    return 1 if pesados else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.admission import AdmissionController
+
+
+async def _ceder():
+    """Deja correr a las tareas pendientes del bucle de eventos."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class Operacion():
+    """Operación que toma turno en el limitador y lo mantiene hasta `terminar()`."""
+
+    def __init__(self, limitador: AdmissionController, usuario: str, orden: list):
+        self.usuario = usuario
+        self._salir = asyncio.Event()
+        self.tarea = asyncio.create_task(self._ejecutar(limitador, orden))
+
+    async def _ejecutar(self, limitador, orden):
+        async with limitador.turno(self.usuario):
+            orden.append(self.usuario)
+            await self._salir.wait()
+
+    def terminar(self):
+        self._salir.set()
+
+
+def test_cola_llena_responde_503_con_retry_after():
+    async def escenario():
+        limitador = AdmissionController(max_concurrentes=1, max_cola=1, max_cola_usuario=1)
+        orden = []
+        activa = Operacion(limitador, "a", orden)
+        await _ceder()
+        en_cola = Operacion(limitador, "b", orden)
+        await _ceder()
+
+        with pytest.raises(HTTPException) as error:
+            async with limitador.turno("c"):
+                pass
+        assert error.value.status_code == 503
+        assert int(error.value.headers["Retry-After"]) >= 1
+
+        activa.terminar()
+        await _ceder()
+        en_cola.terminar()
+        await asyncio.gather(activa.tarea, en_cola.tarea)
+        assert orden == ["a", "b"]
+        assert limitador.activos == 0 and limitador.esperando == 0
+
+    asyncio.run(escenario())
+
+
+def test_limite_por_usuario_no_bloquea_a_otros():
+    async def escenario():
+        limitador = AdmissionController(max_concurrentes=1, max_cola=10, max_cola_usuario=1)
+        orden = []
+        activa = Operacion(limitador, "a", orden)
+        await _ceder()
+        en_cola = Operacion(limitador, "a", orden)
+        await _ceder()
+
+        # El usuario `a` ya tiene su cola llena
+        with pytest.raises(HTTPException) as error:
+            async with limitador.turno("a"):
+                pass
+        assert error.value.status_code == 503
+
+        # Otro usuario todavía puede esperar turno
+        otro = Operacion(limitador, "b", orden)
+        await _ceder()
+        assert limitador.esperando == 2
+
+        for operacion in (activa, en_cola, otro):
+            operacion.terminar()
+            await _ceder()
+        await asyncio.gather(activa.tarea, en_cola.tarea, otro.tarea)
+        assert limitador.activos == 0 and limitador.esperando == 0
+
+    asyncio.run(escenario())
+
+
+def test_turnos_por_rondas_entre_usuarios():
+    async def escenario():
+        limitador = AdmissionController(max_concurrentes=1, max_cola=10, max_cola_usuario=3)
+        orden = []
+        operaciones = [Operacion(limitador, "inicial", orden)]
+        await _ceder()
+        for usuario in ("a", "a", "a", "b"):
+            operaciones.append(Operacion(limitador, usuario, orden))
+            await _ceder()
+
+        for operacion in operaciones:
+            operacion.terminar()
+            await _ceder()
+        await asyncio.gather(*(operacion.tarea for operacion in operaciones))
+        assert orden == ["inicial", "a", "b", "a", "a"]
+
+    asyncio.run(escenario())
+
+
+def test_espera_cancelada_sale_de_la_cola():
+    async def escenario():
+        limitador = AdmissionController(max_concurrentes=1, max_cola=5, max_cola_usuario=2)
+        orden = []
+        activa = Operacion(limitador, "a", orden)
+        await _ceder()
+        cancelada = Operacion(limitador, "b", orden)
+        siguiente = Operacion(limitador, "c", orden)
+        await _ceder()
+
+        cancelada.tarea.cancel()
+        await _ceder()
+        assert limitador.esperando == 1
+
+        activa.terminar()
+        await _ceder()
+        siguiente.terminar()
+        await asyncio.gather(activa.tarea, siguiente.tarea)
+        assert cancelada.tarea.cancelled()
+        assert orden == ["a", "c"]
+        assert limitador.activos == 0 and limitador.esperando == 0
+
+    asyncio.run(escenario())
+
+
+def test_turno_concedido_y_cancelado_pasa_al_siguiente():
+    async def escenario():
+        limitador = AdmissionController(max_concurrentes=1, max_cola=5, max_cola_usuario=2)
+        orden = []
+        await limitador._adquirir("a")
+        cancelada = Operacion(limitador, "b", orden)
+        siguiente = Operacion(limitador, "c", orden)
+        await _ceder()
+
+        # Se concede el turno a `b` y se cancela antes de que llegue a ejecutarse
+        limitador._liberar()
+        cancelada.tarea.cancel()
+        await _ceder()
+
+        siguiente.terminar()
+        await siguiente.tarea
+        assert cancelada.tarea.cancelled()
+        assert orden == ["c"]
+        assert limitador.activos == 0 and limitador.esperando == 0
+
+    asyncio.run(escenario())
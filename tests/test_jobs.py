@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app import database
+from app.jobs import GestorTrabajos, COMPLETADO, ERROR, PENDIENTE, CARGANDO
+
+
+@pytest.fixture
+def workers(tmp_path, monkeypatch):
+    """Dos gestores con distinto identificador sobre la misma base de datos, como dos workers."""
+    monkeypatch.setenv("LOCAL_DB_URL", f"sqlite:///{tmp_path / 'jobs.db'}")
+    monkeypatch.setattr(database, "_engine", None)
+    yield (
+        GestorTrabajos(trabajadores=1, max_pendientes=2, max_resultados=2, ttl=60),
+        GestorTrabajos(trabajadores=1, max_pendientes=2, max_resultados=2, ttl=60),
+    )
+    database.get_engine().dispose()
+
+
+def test_trabajo_visible_y_deduplicado_entre_workers(workers):
+    a, b = workers
+
+    async def escenario():
+        trabajo = await a.enviar(2023, "Monza", "R", ["VER", "HAM"], "usuario")
+        assert (await b.obtener(trabajo.id)).estado == PENDIENTE
+
+        # La misma petición en otro worker reutiliza el trabajo
+        repetido = await b.enviar(2023, " monza ", "r", ["HAM", "VER"], "otro")
+        assert repetido.id == trabajo.id
+
+    asyncio.run(escenario())
+
+
+def test_un_solo_worker_reclama_cada_trabajo(workers):
+    a, b = workers
+
+    async def escenario():
+        trabajo = await a.enviar(2023, "Monza", "R", ["VER"])
+        reclamado = b._reclamar()
+        assert reclamado.id == trabajo.id and reclamado.estado == CARGANDO
+        assert a._reclamar() is None
+
+        reclamado.resultado = [{"Driver": "VER", "LapNumber": 1}]
+        b._actualizar(reclamado, COMPLETADO)
+        terminado = await a.obtener(trabajo.id)
+        assert terminado.estado == COMPLETADO
+        assert terminado.resultado == [{"Driver": "VER", "LapNumber": 1}]
+
+    asyncio.run(escenario())
+
+
+def test_error_guarda_codigo_y_permite_reintentar(workers):
+    a, b = workers
+
+    async def escenario():
+        trabajo = await a.enviar(2023, "Monza", "R", ["XXX"])
+        reclamado = b._reclamar()
+        reclamado.error = "No se encontraron datos"
+        reclamado.codigo = 404
+        b._actualizar(reclamado, ERROR)
+
+        fallido = await a.obtener(trabajo.id)
+        assert fallido.estado == ERROR and fallido.codigo == 404
+
+        # Un trabajo fallido no se reutiliza
+        nuevo = await a.enviar(2023, "Monza", "R", ["XXX"])
+        assert nuevo.id != trabajo.id
+
+    asyncio.run(escenario())
+
+
+def test_cola_compartida_llena_responde_503(workers):
+    a, b = workers
+
+    async def escenario():
+        await a.enviar(2023, "Monza", "R", ["VER"])
+        await b.enviar(2023, "Monza", "R", ["HAM"])
+        with pytest.raises(HTTPException) as error:
+            await a.enviar(2023, "Monza", "R", ["LEC"])
+        assert error.value.status_code == 503
+        assert error.value.headers["Retry-After"] == "30"
+
+    asyncio.run(escenario())
+
+
+def test_purga_por_tamano_y_caducidad(workers):
+    a, b = workers
+
+    async def escenario():
+        ids = []
+        for piloto in ("VER", "HAM", "LEC"):
+            trabajo = await a.enviar(2023, "Monza", "R", [piloto])
+            reclamado = b._reclamar()
+            b._actualizar(reclamado, COMPLETADO)
+            ids.append(trabajo.id)
+
+        # Solo se conservan los `max_resultados` terminados más recientes
+        assert await a.obtener(ids[0]) is None
+        assert await a.obtener(ids[2]) is not None
+
+        a.ttl = 0
+        time.sleep(0.01)
+        assert await a.obtener(ids[2]) is None
+
+    asyncio.run(escenario())
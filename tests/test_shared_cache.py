@@ -0,0 +1,110 @@
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.shared_cache import CacheCompartida
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="la caché compartida usa fcntl")
+
+FILAS = 2000
+
+
+def _vueltas(semilla: int) -> pd.DataFrame:
+    generador = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        "Driver": generador.choice(["VER", "HAM", "LEC"], FILAS).astype(object),
+        "LapNumber": np.arange(1, FILAS + 1, dtype=np.float64),
+        "LapTime": pd.to_timedelta(generador.uniform(80, 90, FILAS), unit="s"),
+        "IsAccurate": pd.array(generador.random(FILAS) > 0.1, dtype="boolean"),
+    })
+
+
+def _obtener(directorio: str, max_bytes: int, semilla: int, registro: str, espera: float):
+    """Pide una sesión a la caché desde un proceso y devuelve un resumen de lo obtenido."""
+    cache = CacheCompartida(directorio, max_bytes)
+
+    def cargar():
+        # Cada carga real deja una línea en el registro compartido
+        with open(registro, "a") as archivo:
+            archivo.write(f"{os.getpid()}\n")
+        time.sleep(espera)
+        return _vueltas(semilla)
+
+    vueltas = cache.obtener(("sesion", semilla), cargar)
+    return {
+        "filas": len(vueltas),
+        "suma": float(vueltas["LapNumber"].sum()),
+        "pilotos": sorted(vueltas["Driver"].astype(str).unique()),
+        "mapeada": isinstance(vueltas["LapNumber"].to_numpy().base, np.memmap),
+    }
+
+
+def _en_procesos(argumentos: list) -> list:
+    contexto = multiprocessing.get_context("fork")
+    with contexto.Pool(len(argumentos)) as pool:
+        return pool.starmap(_obtener, argumentos)
+
+
+def _cargas(registro) -> int:
+    return len(registro.read_text().splitlines()) if registro.exists() else 0
+
+
+def _entradas(directorio) -> list:
+    version = next(directorio.glob("v*"))
+    return sorted(p.name for p in version.iterdir() if not p.name.startswith("."))
+
+
+def test_publica_y_comparte_entre_procesos(tmp_path):
+    registro = tmp_path / "cargas.log"
+    cache = tmp_path / "cache"
+    esperado = _vueltas(1)
+
+    resultados = _en_procesos([(str(cache), 1024 ** 3, 1, str(registro), 0.3)] * 4)
+
+    # Un solo proceso descarga la sesión y todos mapean la versión publicada
+    assert _cargas(registro) == 1
+    for resultado in resultados:
+        assert resultado["filas"] == FILAS
+        assert resultado["suma"] == float(esperado["LapNumber"].sum())
+        assert resultado["pilotos"] == ["HAM", "LEC", "VER"]
+        assert resultado["mapeada"]
+
+    # Un proceso nuevo la abre sin volver a cargarla
+    _en_procesos([(str(cache), 1024 ** 3, 1, str(registro), 0)])
+    assert _cargas(registro) == 1
+
+
+def test_publicada_coincide_con_la_original(tmp_path):
+    cache = CacheCompartida(str(tmp_path), 1024 ** 3)
+    original = _vueltas(2)
+    cache.obtener(("sesion", 2), lambda: original)
+
+    mapeada = cache.obtener(("sesion", 2), lambda: pytest.fail("no debería volver a cargarse"))
+    pd.testing.assert_frame_equal(
+        mapeada.assign(Driver=mapeada["Driver"].astype(object)), original, check_dtype=False
+    )
+
+
+def test_expulsion_elimina_sesiones_y_bloqueos(tmp_path):
+    registro = tmp_path / "cargas.log"
+    cache = tmp_path / "cache"
+    # Espacio para dos sesiones: cada una ocupa unos 40 KB
+    max_bytes = 100 * 1024
+
+    _en_procesos([(str(cache), max_bytes, semilla, str(registro), 0.1) for semilla in range(4)])
+    assert _cargas(registro) == 4
+
+    sesiones = [nombre for nombre in _entradas(cache) if not nombre.endswith(".lock")]
+    assert 1 <= len(sesiones) <= 2
+
+    # Una última publicación expulsa las sesiones antiguas y sus archivos de bloqueo
+    _en_procesos([(str(cache), max_bytes, 10, str(registro), 0)])
+    entradas = _entradas(cache)
+    sesiones = [nombre for nombre in entradas if not nombre.endswith(".lock")]
+    bloqueos = [nombre for nombre in entradas if nombre.endswith(".lock")]
+    assert len(sesiones) <= 2
+    assert {nombre[:-len(".lock")] for nombre in bloqueos} <= set(sesiones)